@@ -0,0 +1,62 @@
+# analytics.py
+"""Attendance rates and at-risk students.
+
+Reports read the trigger-maintained rollups (``attendance_student_rollup``
+per course and student, ``attendance_daily_rollup`` per course and session
+date), so their cost follows the number of students and sessions rather than
+the number of attendance rows. Rates are then computed column-wise with
+NumPy/pandas.
+"""
+import numpy as np
+import pandas as pd
+
+import db
+
+AT_RISK_RATE = 0.75
+MIN_SESSIONS = 3
+
+def _with_rates(df):
+    present = df["present"].to_numpy(dtype=np.int64)
+    sessions = present + df["absent"].to_numpy(dtype=np.int64)
+    df["sessions"] = sessions
+    rate = np.divide(present, sessions, out=np.full(len(df), np.nan), where=sessions > 0)
+    df["rate_pct"] = np.round(rate * 100, 1)
+    return df
+
+def student_rates(course_code=None, student=None):
+    """Per (course, student) present/absent counts and attendance %."""
+    sql = "SELECT course_code, student, present, absent FROM attendance_student_rollup"
+    if course_code is not None:
+        rows = db.query(sql + " WHERE course_code=? ORDER BY student", (course_code,))
+    elif student is not None:
+        rows = db.query(sql + " WHERE student=? ORDER BY course_code", (student,))
+    else:
+        rows = db.query(sql + " ORDER BY course_code, student")
+    df = _with_rates(pd.DataFrame.from_records(rows, columns=["course_code", "student", "present", "absent"]))
+    return df[df["sessions"] > 0].reset_index(drop=True)
+
+def session_rates(course_code):
+    """Per session date for one course: present/absent counts and attendance %."""
+    rows = db.query("SELECT date, present, absent FROM attendance_daily_rollup WHERE course_code=? ORDER BY date",
+                    (course_code,))
+    df = _with_rates(pd.DataFrame.from_records(rows, columns=["date", "present", "absent"]))
+    return df[df["sessions"] > 0].reset_index(drop=True)
+
+def course_rates():
+    """Per course: students, sessions held, marks and overall attendance %."""
+    df = student_rates()
+    grouped = df.groupby("course_code", sort=True).agg(
+        students=("student", "size"), present=("present", "sum"), absent=("absent", "sum")).reset_index()
+    sessions = db.query("SELECT course_code, sum(present + absent > 0) FROM attendance_daily_rollup GROUP BY course_code")
+    held = pd.Series(dict(sessions), dtype="int64")
+    grouped["sessions_held"] = grouped["course_code"].map(held).fillna(0).astype("int64")
+    return _with_rates(grouped).rename(columns={"sessions": "marks"})
+
+def at_risk(course_code=None, threshold=AT_RISK_RATE, min_sessions=MIN_SESSIONS):
+    """Students below ``threshold`` attendance (0–1) after at least ``min_sessions`` marks, worst first."""
+    df = student_rates(course_code)
+    mask = (df["sessions"].to_numpy() >= min_sessions) & (df["rate_pct"].to_numpy() < threshold * 100)
+    return df[mask].sort_values(["rate_pct", "course_code", "student"]).reset_index(drop=True)
+
+def to_csv(df):
+    return df.to_csv(index=False).encode("utf-8")
@@ -0,0 +1,370 @@
+# api.py
+"""Headless JSON API for mobile and scripted clients.
+
+    python -m api [--host 0.0.0.0] [--port 8000] [--workers 4]
+    uvicorn api:app --workers 4
+
+A plain ASGI application (no web framework) over the same database pool and
+helpers as the Streamlit UI. Handlers are blocking and run in worker threads,
+so the event loop only parses requests and writes responses. Everything but
+/login and the gateway's /payments/callback needs an
+``Authorization: Bearer <token>`` header.
+
+    POST /login                    {"username", "password"} -> {"token", "role"}
+    POST /logout
+    GET  /courses                  registered courses (students)
+    POST /courses                  {"course_code"}
+    GET  /messages?cursor=         inbox, one keyset page (newest first)
+    GET  /messages?since=<id>      inbox messages after <id>, oldest first
+    GET  /messages/unread          {"unread", "last_id"}: cheap to poll
+    POST /messages/read            {"up_to"} (optional) marks messages read
+    POST /messages                 {"to", "message"}
+    GET  /payments?cursor=         own payments, one keyset page
+    POST /payments                 {"amount", "idempotency_key"} -> {"id", "status"}
+    GET  /payments/<id>
+    POST /payments/callback        {"checkout_id", "status"} from the gateway (MPESA_CALLBACK_URL)
+    GET  /exams                    exam timetable (students: their registered courses)
+    GET  /library?q=               library search (no q: the whole catalogue)
+    POST /assignments?course_code=&filename=
+                                   raw file body, streamed into the blob store
+    GET  /metrics                  Prometheus text (admins)
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from urllib.parse import parse_qs
+
+import db
+import inbox
+import metrics
+import payments
+import search
+import storage
+import timetable
+from cache import reference
+from helpers import verify_password, send_message, save_uploaded_file
+
+TOKEN_TTL = 7 * 24 * 3600
+MAX_JSON_BYTES = 64 * 1024
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+log = logging.getLogger("myunispace.api")
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class Request:
+    def __init__(self, scope, params):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.params = params
+        self.query = {k: v[-1] for k, v in parse_qs(scope["query_string"].decode()).items()}
+        self.headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        self.json = {}
+        self.body = None
+        self.username = self.role = self.token_hash = None
+
+    def field(self, name, kind=str):
+        value = self.json.get(name)
+        try:
+            value = kind(value) if value is not None else None
+        except (TypeError, ValueError):
+            value = None
+        if value in (None, ""):
+            raise HTTPError(400, f"'{name}' is required")
+        return value
+
+    def cursor(self):
+        value = self.query.get("cursor")
+        if value is None:
+            return None
+        if not value.isdigit():
+            raise HTTPError(400, "'cursor' must be an integer")
+        return int(value)
+
+class BodyReader:
+    """Blocking file-like view of an ASGI request body, read from a worker thread.
+
+    Each ``read`` pulls at most one more chunk from the event loop, so an
+    upload is hashed and written to disk as it arrives instead of being
+    buffered whole.
+    """
+
+    def __init__(self, receive, loop, name, limit=MAX_UPLOAD_BYTES):
+        self.name = name
+        self.size = 0
+        self._receive = receive
+        self._loop = loop
+        self._limit = limit
+        self._buffer = b""
+        self._more = True
+
+    def read(self, size=-1):
+        while not self._buffer and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "client disconnected")
+            self._buffer = message.get("body", b"")
+            self._more = message.get("more_body", False)
+            self.size += len(self._buffer)
+            if self.size > self._limit:
+                raise HTTPError(413, f"upload larger than {self._limit} bytes")
+        if size is None or size < 0 or size >= len(self._buffer):
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+# ---------------------- Tokens ----------------------
+def token_digest(token):
+    # Only a hash is stored, so a copy of the database does not leak live tokens.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def issue_token(username, role):
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    with db.transaction(write=True) as conn:
+        conn.execute("DELETE FROM api_tokens WHERE expires < ?", (now,))
+        conn.execute("INSERT INTO api_tokens (token_hash, username, role, expires) VALUES (?, ?, ?, ?)",
+                     (token_digest(token), username, role, now + TOKEN_TTL))
+    return token
+
+def authenticate(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPError(401, "missing bearer token")
+    digest = token_digest(token.strip())
+    row = db.query_one("SELECT username, role FROM api_tokens WHERE token_hash=? AND expires > ?", (digest, time.time()))
+    if row is None:
+        raise HTTPError(401, "invalid or expired token")
+    request.username, request.role = row
+    request.token_hash = digest
+
+# ---------------------- Routes ----------------------
+ROUTES = []  # (method, compiled path, handler, roles, streamed); roles None = public, () = any role
+
+def route(method, path, roles=(), stream=False):
+    def decorate(fn):
+        ROUTES.append((method, re.compile(path), fn, roles, stream))
+        return fn
+    return decorate
+
+def page(rows, next_cursor, columns):
+    return {"items": [dict(zip(columns, r)) for r in rows], "next_cursor": next_cursor}
+
+@route("POST", "/login", roles=None)
+def login(request):
+    username = request.field("username")
+    row = db.query_one("SELECT role, password FROM users WHERE username=?", (username,))
+    if not row or not verify_password(request.field("password"), row[1]):
+        raise HTTPError(401, "invalid credentials")
+    return 200, {"token": issue_token(username, row[0]), "role": row[0]}
+
+@route("POST", "/logout")
+def logout(request):
+    db.execute("DELETE FROM api_tokens WHERE token_hash=?", (request.token_hash,))
+    return 200, {}
+
+@route("GET", "/courses", roles=("Student",))
+def list_courses(request):
+    rows = db.query("SELECT course_code FROM registrations WHERE student=?", (request.username,))
+    return 200, {"courses": [r[0] for r in rows]}
+
+@route("POST", "/courses", roles=("Student",))
+def register_course(request):
+    course_code = request.field("course_code")
+    db.execute("INSERT OR IGNORE INTO registrations (student, course_code) VALUES (?, ?)", (request.username, course_code))
+    return 201, {"course_code": course_code}
+
+MESSAGE_FIELDS = ("id", "sender", "message", "timestamp", "read_at")
+
+@route("GET", "/messages")
+def list_messages(request):
+    since = request.query.get("since")
+    if since is not None:
+        if not since.isdigit():
+            raise HTTPError(400, "'since' must be an integer")
+        rows = inbox.since(request.username, int(since))
+        return 200, {"items": [dict(zip(MESSAGE_FIELDS, r)) for r in rows],
+                     "last_id": rows[-1][0] if rows else int(since)}
+    rows, next_cursor = db.fetch_page("messages", ", ".join(MESSAGE_FIELDS), "receiver=?",
+                                      (request.username,), cursor=request.cursor())
+    return 200, page(rows, next_cursor, MESSAGE_FIELDS)
+
+@route("GET", "/messages/unread")
+def unread_messages(request):
+    unread, last_id = inbox.counters(request.username)
+    return 200, {"unread": unread, "last_id": last_id}
+
+@route("POST", "/messages/read")
+def read_messages(request):
+    up_to = request.json.get("up_to")
+    if up_to is not None and not isinstance(up_to, int):
+        raise HTTPError(400, "'up_to' must be an integer")
+    return 200, {"marked": inbox.mark_read(request.username, up_to=up_to)}
+
+@route("POST", "/messages")
+def post_message(request):
+    send_message(request.username, request.field("to"), request.field("message"))
+    return 202, {}
+
+@route("GET", "/payments", roles=("Student",))
+def list_payments(request):
+    rows, next_cursor = db.fetch_page("payments", "id, amount, status, timestamp", "student=?",
+                                      (request.username,), cursor=request.cursor())
+    return 200, page(rows, next_cursor, ("id", "amount", "status", "timestamp"))
+
+@route("POST", "/payments", roles=("Student",))
+def pay(request):
+    amount = request.field("amount", float)
+    if amount <= 0:
+        raise HTTPError(400, "'amount' must be positive")
+    payment_id, status = payments.submit(request.username, amount, request.json.get("idempotency_key"))
+    return 202, {"id": payment_id, "status": status}
+
+@route("POST", "/payments/callback", roles=None)
+def payment_callback(request):
+    # Checkout ids are random and only ever sent to the gateway; the poller
+    # resolves the payment anyway if a callback never arrives.
+    applied = payments.handle_callback(request.field("checkout_id"), request.field("status"))
+    return 200, {"applied": applied}
+
+@route("GET", r"/payments/(?P<id>\d+)")
+def get_payment(request):
+    row = db.query_one("SELECT student, amount, status, timestamp FROM payments WHERE id=?", (int(request.params["id"]),))
+    if row is None or (row[0] != request.username and request.role != "Admin"):
+        raise HTTPError(404, "no such payment")
+    return 200, dict(zip(("student", "amount", "status", "timestamp"), row))
+
+@route("GET", "/exams")
+def exams(request):
+    if request.role == "Student":
+        rows = timetable.student_timetable(request.username)
+    else:
+        rows = reference.query("exams", "SELECT course_code, exam_date, start_time, end_time, center FROM exams "
+                                        "ORDER BY exam_date, start_time")
+    return 200, {"exams": [dict(zip(("course_code", "exam_date", "start_time", "end_time", "center"), r)) for r in rows]}
+
+@route("GET", "/library")
+def library(request):
+    rows = search.library(request.query.get("q", ""))
+    return 200, {"books": [dict(zip(("title", "author", "available"), r)) for r in rows]}
+
+@route("POST", "/assignments", roles=("Student",), stream=True)
+def upload_assignment(request):
+    request.body.name = request.query.get("filename") or "upload"
+    try:
+        path = save_uploaded_file(request.body, request.username, request.query.get("course_code") or "General")
+    except storage.QuotaExceeded as e:
+        raise HTTPError(413, str(e))
+    return 201, {"filename": request.body.name, "sha256": os.path.basename(path), "size": request.body.size}
+
+@route("GET", "/metrics", roles=("Admin",))
+def prometheus(request):
+    return 200, metrics.registry.prometheus()
+
+# ---------------------- ASGI ----------------------
+async def read_json(receive):
+    chunks, size, more = [], 0, True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "client disconnected")
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if size > MAX_JSON_BYTES:
+            raise HTTPError(413, f"request body larger than {MAX_JSON_BYTES} bytes")
+        more = message.get("more_body", False)
+    if not size:
+        return {}
+    try:
+        data = json.loads(b"".join(chunks))
+    except ValueError:
+        raise HTTPError(400, "request body is not valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return data
+
+def handle(handler, request, roles):
+    if roles is not None:
+        authenticate(request)
+        if roles and request.role not in roles:
+            raise HTTPError(403, f"only for {', '.join(roles)}")
+    return handler(request)
+
+async def dispatch(scope, receive):
+    allowed = False
+    for method, pattern, handler, roles, stream in ROUTES:
+        match = pattern.fullmatch(scope["path"])
+        if match is None:
+            continue
+        if method != scope["method"]:
+            allowed = True
+            continue
+        request = Request(scope, match.groupdict())
+        if stream:
+            request.body = BodyReader(receive, asyncio.get_running_loop(), None)
+        else:
+            request.json = await read_json(receive)
+        status, payload = await asyncio.to_thread(handle, handler, request, roles)
+        return pattern.pattern, status, payload
+    raise HTTPError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await asyncio.to_thread(db.init, db.DB_FILE, db.UPLOAD_DIR)
+            await asyncio.to_thread(payments.get_processor)  # resumes payments left PENDING
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(db.get_pool().close)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    start = time.perf_counter()
+    name = "unmatched"
+    try:
+        name, status, payload = await dispatch(scope, receive)
+    except HTTPError as e:
+        status, payload = e.status, {"error": e.message}
+    except Exception:
+        log.exception("unhandled error on %s %s", scope["method"], scope["path"])
+        status, payload = 500, {"error": "internal server error"}
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), b"text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), b"application/json"
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+    metrics.observe("api", f"{scope['method']} {name}", time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the MyUniSpace JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Serving the API needs an ASGI server: pip install uvicorn")
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+if __name__ == "__main__":
+    main()
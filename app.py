@@ -1,195 +1,683 @@
 # app.py
 import streamlit as st
-import sqlite3
-import hashlib
-from datetime import datetime
-from reportlab.pdfgen import canvas
+from datetime import datetime, time
+import functools
+from contextlib import contextmanager
 import random
 import os
-import io
+import uuid
+
+import analytics
+import attendance
+import db
+import documents
+import elections
+import hostel
+import images
+import inbox
+import metrics
+import payments
+import reporting
+import search
+import storage
+import timetable
+import writebehind
+from cache import reference
+from helpers import (
+    hash_password, verify_password, send_message, generate_pdf_bytes,
+    mpesa_payment, save_uploaded_file, save_camera_image,
+)
 
 # ---------------------- Database ----------------------
-DB_FILE = "myunispace.db"
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-c = conn.cursor()
-
-def create_tables():
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        role TEXT,
-        full_name TEXT,
-        student_id TEXT,
-        username TEXT UNIQUE,
-        email TEXT,
-        phone TEXT,
-        password TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        sender TEXT,
-        receiver TEXT,
-        message TEXT,
-        timestamp TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS courses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_code TEXT,
-        course_name TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS registrations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student TEXT,
-        course_code TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS exams (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_code TEXT,
-        exam_date TEXT,
-        center TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS attendance (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student TEXT,
-        course_code TEXT,
-        date TEXT,
-        status TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS assignments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student TEXT,
-        course_code TEXT,
-        filename TEXT,
-        timestamp TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS payments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student TEXT,
-        amount REAL,
-        status TEXT,
-        timestamp TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS hostel (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student TEXT,
-        room_number TEXT,
-        status TEXT,
-        timestamp TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS forum (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user TEXT,
-        message TEXT,
-        timestamp TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS elections (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student TEXT,
-        candidate TEXT,
-        timestamp TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS library (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        author TEXT,
-        available INTEGER
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS jobs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        company TEXT,
-        description TEXT,
-        contact TEXT
-    )''')
-create_tables()
-conn.commit()
-
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-# ---------------------- Helpers ----------------------
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password(password: str, hashed: str) -> bool:
-    return hash_password(password) == hashed
-
-def send_message(sender: str, receiver: str, message: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO messages (sender, receiver, message, timestamp) VALUES (?, ?, ?, ?)",
-              (sender, receiver, message, timestamp))
-    conn.commit()
-
-def generate_pdf_bytes(text_lines):
-    """Return PDF bytes for download (in-memory)."""
-    buf = io.BytesIO()
-    pdf = canvas.Canvas(buf)
-    y = 800
-    for line in text_lines:
-        pdf.drawString(50, y, line)
-        y -= 18
-        if y < 50:
-            pdf.showPage()
-            y = 800
-    pdf.save()
-    buf.seek(0)
-    return buf.read()
-
-def generate_pdf_file(path, text_lines):
-    b = generate_pdf_bytes(text_lines)
-    with open(path, "wb") as f:
-        f.write(b)
-    return path
-
-def mpesa_payment(student: str, amount: float):
-    status = random.choice(["SUCCESS", "FAILED"])  # simulate
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO payments (student, amount, status, timestamp) VALUES (?, ?, ?, ?)",
-              (student, amount, status, timestamp))
-    conn.commit()
-    return status
-
-def save_uploaded_file(uploaded_file, student, course_code="General"):
-    filename = uploaded_file.name
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO assignments (student, course_code, filename, timestamp) VALUES (?, ?, ?, ?)",
-              (student, course_code, filename, timestamp))
-    conn.commit()
-    return file_path
-
-def save_camera_image(camera_image, username):
-    filename = f"{username}_camera_{int(datetime.now().timestamp())}.png"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    with open(file_path, "wb") as f:
-        f.write(camera_image.getbuffer())
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO assignments (student, course_code, filename, timestamp) VALUES (?, ?, ?, ?)",
-              (username, "General", filename, timestamp))
-    conn.commit()
-    return file_path
-
-# Seed simple library & job board (only once)
-def seed_sample_data():
-    c.execute("SELECT count(*) FROM library")
-    if c.fetchone()[0] == 0:
-        sample_books = [
-            ("Discrete Math", "Rosen", 3),
-            ("Algorithm Design", "Kleinberg", 2),
-            ("Database Systems", "Elmasri", 1),
-            ("Operating Systems", "Tanenbaum", 2)
-        ]
-        c.executemany("INSERT INTO library (title, author, available) VALUES (?, ?, ?)", sample_books)
-    c.execute("SELECT count(*) FROM jobs")
-    if c.fetchone()[0] == 0:
-        sample_jobs = [
-            ("Backend Intern", "Acme Ltd", "Work on APIs", "jobs@acme.example"),
-            ("Data Analyst", "DataCorp", "Analyze student data", "hr@datacorp.example")
-        ]
-        c.executemany("INSERT INTO jobs (title, company, description, contact) VALUES (?, ?, ?, ?)", sample_jobs)
-    conn.commit()
-seed_sample_data()
+DB_FILE = db.DB_FILE
+UPLOAD_DIR = db.UPLOAD_DIR
+
+# Streamlit re-executes this script on every interaction; the connection pool,
+# schema check, upload dir and seed data only need to happen once per process.
+@st.cache_resource
+def get_pool():
+    pool = db.init(DB_FILE, UPLOAD_DIR)
+    payments.get_processor()  # resumes payments left PENDING by a previous process
+    if images.available():
+        images.get_processor()  # and camera captures still waiting to be transcoded
+    if reporting.ENABLED:
+        reporting.start_refresher()
+    return pool
+
+get_pool()
+
+# ---------------------- UI helpers ----------------------
+def dashboard_section(title):
+    """Render the decorated function as an ``st.fragment`` under a ``title`` subheader.
+
+    A widget inside a fragment reruns only that fragment, so clicking a button
+    in one section no longer re-executes every other section's queries. Each
+    run is also timed as a metrics section.
+    """
+    def decorate(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            metrics.section(f"{st.session_state['role']}/{title}")
+            st.subheader(title)
+            try:
+                fn(*args, **kwargs)
+            finally:
+                metrics.end_section()
+        return run
+    return decorate
+
+def paged_view(key, table, columns, render, where="", params=(), descending=True):
+    """Render one keyset page of ``table`` with Previous/Next controls.
+
+    The cursor stack lives in session_state so paging survives reruns.
+    Must be called from inside a dashboard section.
+    """
+    stack = st.session_state.setdefault(f"{key}_cursors", [None])
+    rows, next_cursor = db.fetch_page(table, columns, where, params, cursor=stack[-1], descending=descending)
+    if not rows:
+        st.info("Nothing to show.")
+    for row in rows:
+        render(row)
+    prev_col, page_col, next_col = st.columns(3)
+    if len(stack) > 1 and prev_col.button("Previous", key=f"{key}_prev"):
+        stack.pop()
+        st.rerun(scope="fragment")
+    page_col.write(f"Page {len(stack)}")
+    if next_cursor is not None and next_col.button("Next", key=f"{key}_next"):
+        stack.append(next_cursor)
+        st.rerun(scope="fragment")
+
+@contextmanager
+def report_data():
+    """Serve the block's reads from the reporting snapshot, with a caption saying how fresh it is."""
+    with reporting.reads() as snapshot:
+        st.caption(reporting.describe(snapshot))
+        yield
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def lazy_download(key, path, file_name):
+    """Offer a file for download without reading it until it is asked for.
+
+    ``data`` is a callable, so rendering a listing only stats each file;
+    Streamlit reads the file when its button is clicked.
+    """
+    if not os.path.exists(path):
+        return
+    st.download_button(f"Download {file_name}", data=functools.partial(read_file, path), file_name=file_name,
+                       on_click="ignore", key=f"{key}_download")
+
+def submission_preview(thumb_sha256, media_status):
+    """Thumbnail of a camera capture, so listings never load the full image."""
+    if thumb_sha256:
+        st.image(storage.blob_path(thumb_sha256), width=images.THUMB_SIZE // 2)
+    elif media_status == "pending":
+        st.caption("Image is being processed…")
+
+# ---------------------- Inbox ----------------------
+INBOX_POLL_SECONDS = 15
+
+@st.fragment(run_every=INBOX_POLL_SECONDS)
+def inbox_badge(username):
+    """Sidebar inbox button with a live unread count; polling reads no table unless something was written."""
+    if st.button("My Inbox"):
+        st.query_params["view"] = "inbox"
+        st.session_state["inbox_open"] = True
+        st.rerun()
+    unread = inbox.unread(username)
+    if unread:
+        st.caption(f"🔵 {unread} unread")
+
+@dashboard_section("Inbox")
+def inbox_section(username):
+    unread, last_id = inbox.counters(username)
+    status = st.empty()
+    status.write(f"{unread} unread" if unread else "No unread messages")
+    if st.query_params.get("view") == "inbox":
+        st.session_state.setdefault("inbox_open", True)
+    if not st.toggle("View Inbox", key="inbox_open"):
+        return
+    # Messages already shown stay in the session; each run fetches only ids after the newest one.
+    loaded = st.session_state.get("inbox_messages")
+    if loaded is None:
+        loaded = st.session_state["inbox_messages"] = inbox.recent(username)
+    newest = loaded[-1][0] if loaded else 0
+    if last_id > newest:
+        loaded.extend(inbox.since(username, newest))
+        newest = loaded[-1][0] if loaded else 0
+    read_col, older_col = st.columns(2)
+    if unread and read_col.button("Mark all as read", key="inbox_mark_read"):
+        inbox.mark_read(username, up_to=newest)
+        loaded[:] = [m if m[4] else (*m[:4], "read") for m in loaded]
+        unread = inbox.unread(username)
+        status.write(f"{unread} unread" if unread else "No unread messages")
+    if loaded and older_col.button("Load older", key="inbox_older"):
+        older = inbox.before(username, loaded[0][0])
+        loaded[:0] = older
+        if not older:
+            st.info("No older messages.")
+    if not loaded:
+        st.info("No messages.")
+    for msg_id, sender, message, timestamp, read_at in reversed(loaded):
+        st.write(f"{'🔵 ' if read_at is None else ''}{timestamp} | {sender}: {message}")
+
+# ---------------------- Student dashboard ----------------------
+@dashboard_section("Profile & Courses")
+def student_profile(username):
+    profile = db.query_one("SELECT full_name, student_id, email, phone FROM users WHERE username=?", (username,))
+    st.write("Name:", profile[0] if profile else "")
+    st.write("Student ID:", profile[1] if profile else "")
+    st.write("Email:", profile[2] if profile else "")
+    st.write("Phone:", profile[3] if profile else "")
+
+@dashboard_section("Course Registration")
+def student_registration(username):
+    new_course = st.text_input("Course code to register (e.g. CS101)")
+    if st.button("Register Course"):
+        if new_course:
+            db.execute("INSERT OR IGNORE INTO registrations (student, course_code) VALUES (?, ?)", (username, new_course))
+            st.success(f"Registered {new_course}")
+
+    # VIEW REGISTERED COURSES
+    reg_courses = [r[0] for r in db.query("SELECT course_code FROM registrations WHERE student=?", (username,))]
+    st.write("Registered courses:", reg_courses if reg_courses else "None")
+
+@dashboard_section("Assignments")
+def student_assignments(username):
+    # Upload + camera
+    reg_courses = [r[0] for r in db.query("SELECT course_code FROM registrations WHERE student=?", (username,))]
+    course_for_assign = st.selectbox("Select course", ["General"] + reg_courses, key="assign_course")
+    uploaded = st.file_uploader("Upload file for assignment", type=["pdf","docx","doc","jpg","png"])
+    cam = st.camera_input("Or capture image with camera")
+    if st.button("Submit Assignment"):
+        try:
+            if uploaded:
+                save_uploaded_file(uploaded, username, course_for_assign)
+                st.success("Assignment uploaded: " + uploaded.name)
+            elif cam:
+                save_camera_image(cam, username, course_for_assign)
+                st.success("Captured image saved as assignment")
+            else:
+                st.error("Choose a file or capture an image.")
+        except storage.QuotaExceeded as e:
+            st.error(str(e))
+    st.caption(f"Storage used: {storage.usage(username) / 1e6:.1f} of {storage.QUOTA_BYTES / 1e6:.0f} MB")
+
+    # VIEW & DOWNLOAD OWN ASSIGNMENTS
+    st.write("Your submissions:")
+    assigns = db.query("SELECT id, course_code, filename, timestamp, sha256, thumb_sha256, media_status "
+                       "FROM assignments WHERE student=?", (username,))
+    for a in assigns:
+        st.write(f"{a[3]} | {a[1]} | {a[2]}")
+        submission_preview(a[5], a[6])
+        lazy_download(f"own_assignment_{a[0]}", storage.path_for(a[4], a[2]), a[2])
+
+@dashboard_section("Fees & Payments")
+def student_fees(username):
+    amount = st.number_input("Amount (KES)", min_value=1.0, value=100.0, step=1.0)
+    # One idempotency key per payment attempt, replaced once it is submitted.
+    pay_key = st.session_state.setdefault("payment_key", uuid.uuid4().hex)
+    if st.button("Pay (simulate M-Pesa)"):
+        status = mpesa_payment(username, amount, pay_key)
+        st.session_state["payment_key"] = uuid.uuid4().hex
+        st.success(f"Payment status: {status} — confirm the prompt on your phone, then check View Payments.")
+    if st.button("View Payments"):
+        pays = db.query("SELECT amount, status, timestamp FROM payments WHERE student=?", (username,))
+        for p in pays:
+            st.write(f"{p[2]} | KES {p[0]} | {p[1]}")
+    if st.button("Download Fee Statement (PDF)"):
+        pdf_bytes = documents.render("fee_statement", username)
+        st.download_button("Download Fee Statement PDF", data=pdf_bytes, file_name=f"fee_statement_{username}.pdf")
+
+@dashboard_section("Exams & Results")
+def student_exams(username):
+    if st.button("View Exam Timetable"):
+        exams = timetable.student_timetable(username)
+        if exams:
+            for course, date, start, end, center in exams:
+                st.write(f"{course} | {date} {start}-{end} | {center}")
+        else:
+            st.info("No exams scheduled for your registered courses.")
+
+    if st.button("Generate Exam Card (PDF)"):
+        pdf_bytes = documents.render("exam_card", username)
+        st.download_button("Download Exam Card PDF", data=pdf_bytes, file_name=f"exam_card_{username}.pdf")
+
+    if st.button("View Results (sample)"):
+        # Random sample grades (demo)
+        regs = db.query("SELECT course_code FROM registrations WHERE student=?", (username,))
+        if not regs:
+            st.info("No registered courses to show results.")
+        else:
+            for r in regs:
+                st.write(f"{r[0]} : {random.choice(['A','B','C','D','E','F'])}")
+
+@dashboard_section("Hostel")
+def student_hostel(username):
+    pref_room = st.text_input("Preferred rooms or blocks (most preferred first, comma separated)")
+    if st.button("Apply for Hostel"):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        writebehind.submit("INSERT INTO hostel (student, room_number, status, timestamp) VALUES (?, ?, ?, ?)",
+                           (username, pref_room, "Pending", timestamp))
+        st.success("Hostel application submitted")
+    if st.button("View Hostel Application Status"):
+        apps = db.query("SELECT room_number, status, timestamp, allocated_room FROM hostel WHERE student=?", (username,))
+        for a in apps:
+            st.write(f"{a[2]} | Preferred: {a[0]} | Status: {a[1]}" + (f" | Allocated: {a[3]}" if a[3] else ""))
+
+@dashboard_section("Forum")
+def student_forum(username):
+    forum_post = st.text_area("Write a forum post")
+    if st.button("Post to Forum"):
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        writebehind.submit("INSERT INTO forum (user, message, timestamp) VALUES (?, ?, ?)", (username, forum_post, ts))
+        st.success("Posted")
+    forum_q = st.text_input("Search forum", key="student_forum_search")
+    if st.button("Search Forum"):
+        for p in search.search("forum", forum_q):
+            st.write(f"{p[2]} | {p[0]}: {p[1]}")
+    if st.toggle("View Forum Posts"):
+        paged_view("student_forum", "forum", "user, message, timestamp",
+                   lambda p: st.write(f"{p[2]} | {p[0]}: {p[1]}"))
+
+@dashboard_section("Elections")
+def student_elections(username):
+    ballot = st.selectbox("Election / position", elections.positions(), format_func=lambda p: f"{p[0]} — {p[1]}")
+    candidate = st.text_input("Candidate name to vote for")
+    if st.button("Vote"):
+        if not candidate:
+            st.error("Enter a candidate name.")
+        elif elections.cast_vote(username, candidate, *ballot):
+            st.success("Vote recorded")
+        else:
+            st.warning("You have already voted for this position.")
+
+@dashboard_section("Library")
+def student_library():
+    q = st.text_input("Search library (title or author)")
+    if st.button("Search Library"):
+        books = search.library(q)
+        if not books:
+            st.info("No matching books.")
+        for b in books:
+            st.write(f"{b[0]} by {b[1]} — Available: {b[2]}")
+
+@dashboard_section("Jobs & Internships")
+def student_jobs():
+    job_q = st.text_input("Search jobs (title, company or description)")
+    if st.button("Search Jobs"):
+        for j in search.search("jobs", job_q):
+            st.write(f"{j[0]} — {j[1]} | {j[2]} | Contact: {j[3]}")
+    if st.button("View Job Board"):
+        jobs = reference.query("jobs", "SELECT title, company, description, contact FROM jobs")
+        for j in jobs:
+            st.write(f"{j[0]} — {j[1]} | {j[2]} | Contact: {j[3]}")
+
+@dashboard_section("Messaging")
+def student_messaging(username):
+    to = st.text_input("Send message to (username)")
+    body = st.text_area("Message")
+    if st.button("Send"):
+        if to and body:
+            send_message(username, to, body)
+            st.success("Message sent")
+
+# ---------------------- Lecturer dashboard ----------------------
+@dashboard_section("Courses")
+def lecturer_courses():
+    lec_course_code = st.text_input("Course Code")
+    lec_course_name = st.text_input("Course Name")
+    if st.button("Add Course"):
+        if lec_course_code and lec_course_name:
+            reference.execute("courses", "INSERT INTO courses (course_code, course_name) VALUES (?, ?)", (lec_course_code, lec_course_name))
+            st.success("Course added")
+
+    if st.button("View All Courses"):
+        for course in reference.query("courses", "SELECT course_code, course_name FROM courses"):
+            st.write(course[0], "-", course[1])
+
+def post_exam_form(key, button):
+    """Exam scheduling inputs; the exam is vetted for clashes and centre capacity before it is stored."""
+    course = st.text_input("Course Code for exam", key=f"{key}_course")
+    date = st.date_input("Exam Date", key=f"{key}_date")
+    start = st.time_input("Start time", value=time(9, 0), key=f"{key}_start")
+    end = st.time_input("End time", value=time(12, 0), key=f"{key}_end")
+    center = st.text_input("Exam Center", key=f"{key}_center")
+    force = st.checkbox("Schedule even if it clashes", key=f"{key}_force")
+    if st.button(button):
+        exam = (course, str(date), start.strftime("%H:%M"), end.strftime("%H:%M"), center)
+        try:
+            clashes, overloads = timetable.check_exam(*exam)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if clashes:
+            st.warning(f"{len(clashes)} registered students already sit another exam at that time.")
+            st.dataframe([c._asdict() for c in clashes[:200]])
+        for o in overloads:
+            st.warning(f"{o.center} would hold {o.candidates} candidates from {o.start_time} ({o.capacity} seats).")
+        if (clashes or overloads) and not force:
+            st.error("Exam not scheduled.")
+            return
+        reference.execute("exams", "INSERT INTO exams (course_code, exam_date, start_time, end_time, center) "
+                          "VALUES (?, ?, ?, ?, ?)", exam)
+        st.success("Exam scheduled")
+
+@dashboard_section("Exams")
+def lecturer_exams():
+    post_exam_form("lec_exam", "Post Exam Schedule")
+
+@dashboard_section("Assignments")
+def lecturer_assignments():
+    # View & grade assignments (simplified)
+    view_course = st.text_input("Course code to view submissions")
+    if st.toggle("View Submissions"):
+        subs = db.query("SELECT id, student, filename, timestamp, sha256, thumb_sha256, media_status "
+                        "FROM assignments WHERE course_code=?", (view_course,))
+        if subs:
+            for s in subs:
+                st.write(f"{s[3]} | {s[1]} | {s[2]}")
+                submission_preview(s[5], s[6])
+                lazy_download(f"submission_{s[0]}", storage.path_for(s[4], s[2]), s[2])
+        else:
+            st.info("No submissions")
+
+@dashboard_section("Attendance")
+def lecturer_attendance():
+    att_student = st.text_input("Student username")
+    att_course = st.text_input("Course code")
+    att_status = st.selectbox("Status", ["Present", "Absent"])
+    if st.button("Mark Attendance"):
+        attendance.record([(att_student, att_course, attendance.today(), att_status)])
+        st.success("Attendance recorded")
+
+    # Whole-class roster: everyone Present except the selected absentees
+    roster_course = st.text_input("Course code for roster", key="roster_course")
+    roster_date = st.date_input("Session date", key="roster_date")
+    if roster_course:
+        class_list = attendance.roster(roster_course)
+        if class_list:
+            absentees = st.multiselect(f"Absent ({len(class_list)} registered)", class_list, key="roster_absent")
+            if st.button("Save Roster Attendance"):
+                n = attendance.mark_session(roster_course, str(roster_date), class_list, absentees)
+                st.success(f"Attendance saved for {n} students ({len(absentees)} absent)")
+        else:
+            st.info("No students registered for this course.")
+
+    att_csv = st.file_uploader("Import attendance CSV (student,status[,course_code,date])", type=["csv"])
+    if att_csv and st.button("Import Attendance CSV"):
+        try:
+            rows = attendance.parse_csv(att_csv.getvalue(), roster_course or None, str(roster_date))
+            st.success(f"Imported {attendance.record(rows)} attendance rows")
+        except ValueError as e:
+            st.error(f"Could not import CSV: {e}")
+
+@dashboard_section("Attendance Reports")
+def lecturer_attendance_reports():
+    report_course = st.text_input("Course code", key="report_course")
+    threshold = st.slider("At-risk below (%)", 0, 100, int(analytics.AT_RISK_RATE * 100), key="report_threshold")
+    if report_course:
+        by_student = analytics.student_rates(report_course)
+        if by_student.empty:
+            st.info("No attendance recorded for this course.")
+            return
+        st.write("Per student")
+        st.dataframe(by_student, use_container_width=True)
+        st.download_button("Download per-student CSV", analytics.to_csv(by_student),
+                           file_name=f"attendance_{report_course}.csv", mime="text/csv")
+        risk = analytics.at_risk(report_course, threshold / 100)
+        st.write(f"At risk ({len(risk)} students)")
+        st.dataframe(risk, use_container_width=True)
+        st.download_button("Download at-risk CSV", analytics.to_csv(risk),
+                           file_name=f"at_risk_{report_course}.csv", mime="text/csv")
+        sessions = analytics.session_rates(report_course)
+        st.write("Attendance per session (%)")
+        st.line_chart(sessions.set_index("date")["rate_pct"])
+
+@dashboard_section("Messaging")
+def lecturer_messaging(username):
+    to = st.text_input("Send message to (username)")
+    body = st.text_area("Message body")
+    if st.button("Send Message"):
+        if to and body:
+            send_message(username, to, body)
+            st.success("Message sent")
+
+# ---------------------- Admin dashboard ----------------------
+@dashboard_section("Users")
+def admin_users():
+    if st.toggle("View All Users"):
+        paged_view("admin_users", "users", "id, role, username, full_name, email, phone",
+                   lambda u: st.write(f"{u[0]} | {u[1]} | {u[2]} | {u[3]} | {u[4]} | {u[5]}"),
+                   descending=False)
+
+@dashboard_section("Courses")
+def admin_courses():
+    new_code = st.text_input("Course code")
+    new_name = st.text_input("Course name")
+    if st.button("Create Course"):
+        if new_code and new_name:
+            reference.execute("courses", "INSERT INTO courses (course_code, course_name) VALUES (?, ?)", (new_code, new_name))
+            st.success("Course created")
+    if st.button("View Courses"):
+        for row in reference.query("courses", "SELECT * FROM courses"):
+            st.write(row)
+
+@dashboard_section("Exams")
+def admin_exams():
+    if st.button("View Exams"):
+        for e in reference.query("exams", "SELECT * FROM exams"):
+            st.write(e)
+    # Create exam as admin
+    post_exam_form("adm_exam", "Create Exam (admin)")
+
+    center = st.text_input("Exam center name", key="adm_center_name")
+    seats = st.number_input("Seats", min_value=0, value=100, step=10, key="adm_center_seats")
+    if st.button("Save Center Capacity") and center:
+        timetable.set_center_capacity(center, seats)
+        st.success(f"{center}: {seats} seats")
+
+    if st.button("Validate Timetable"):
+        clashes, overloads = timetable.validate()
+        st.write(f"{len(clashes)} student clashes, {len(overloads)} over-capacity centre slots")
+        if clashes:
+            st.dataframe([c._asdict() for c in clashes[:1000]])
+        if overloads:
+            st.dataframe([o._asdict() for o in overloads])
+        st.download_button("Download timetable report (CSV)", data=timetable.report_csv(clashes, overloads),
+                           file_name="timetable_report.csv", mime="text/csv")
+
+@dashboard_section("Payments")
+def admin_payments():
+    if st.toggle("View All Payments"):
+        with report_data():
+            paged_view("admin_payments", "payments", "*", st.write, descending=False)
+
+@dashboard_section("Assignments")
+def admin_assignments():
+    saved = images.savings()
+    st.caption(f"Camera captures: {saved['images']} transcoded, {saved['original_bytes'] / 1e6:.1f} MB → "
+               f"{saved['stored_bytes'] / 1e6:.1f} MB ({saved['saved_pct']}% saved), {saved['pending']} pending"
+               + ("" if images.available() else " — install Pillow to transcode new captures"))
+    if st.toggle("View All Assignments"):
+        def render_assignment(a):
+            st.write(a)
+            lazy_download(f"admin_assignment_{a[0]}", storage.path_for(a[5], a[3]), a[3])
+        with report_data():
+            paged_view("admin_assignments", "assignments", "*", render_assignment)
+
+@dashboard_section("Hostel applications")
+def admin_hostel():
+    statuses = st.multiselect("Application status", hostel.STATUSES, default=hostel.STATUSES,
+                              key="hostel_statuses")
+    # Live, not the reporting snapshot: this is read right after allocating or vacating.
+    if st.button("View Hostels"):
+        for h in hostel.applications(statuses):
+            st.write(h)
+    vacating = st.text_input("Student to vacate (username)", key="hostel_vacate_student")
+    if st.button("Vacate Bed"):
+        if not vacating:
+            st.error("Enter a student username.")
+        elif hostel.vacate(vacating):
+            st.success(f"Bed released for {vacating}")
+        else:
+            st.warning(f"{vacating} has no allocated bed.")
+
+    # Rooms and capacity
+    room_no = st.text_input("Room number", key="hostel_room_number")
+    room_block = st.text_input("Block", key="hostel_room_block")
+    room_capacity = st.number_input("Beds", min_value=0, value=2, key="hostel_room_capacity")
+    if st.button("Save Room"):
+        if room_no:
+            hostel.add_room(room_no, room_block, room_capacity)
+            st.success(f"Room {room_no} saved")
+    if st.toggle("View Rooms"):
+        st.dataframe([dict(zip(("room", "block", "beds", "occupied"), r)) for r in hostel.rooms()],
+                     use_container_width=True)
+
+    # Assign every pending/waitlisted application in first-come order
+    fallback = st.checkbox("Give any free bed when all preferences are full", value=True)
+    dry_run = st.checkbox("Preview only (dry run)")
+    if st.button("Allocate Rooms"):
+        counts = hostel.allocate(fallback=fallback, dry_run=dry_run)
+        st.success(f"{'Would approve' if dry_run else 'Approved'} {counts['Approved']}, "
+                   f"waitlisted {counts['Waitlisted']}, duplicates {counts['Duplicate']}; "
+                   f"{counts['free_beds']} beds left")
+
+@dashboard_section("Attendance Analytics")
+def admin_attendance():
+    if st.toggle("View Attendance by Course"):
+        with report_data():
+            courses = analytics.course_rates()
+        st.dataframe(courses, use_container_width=True)
+        st.download_button("Download course attendance CSV", analytics.to_csv(courses),
+                           file_name="attendance_by_course.csv", mime="text/csv")
+    threshold = st.slider("At-risk below (%)", 0, 100, int(analytics.AT_RISK_RATE * 100), key="admin_risk_threshold")
+    if st.toggle("View At-risk Students"):
+        with report_data():
+            risk = analytics.at_risk(threshold=threshold / 100)
+        st.write(f"{len(risk)} student-course pairs below {threshold}%")
+        st.dataframe(risk, use_container_width=True)
+        st.download_button("Download at-risk CSV", analytics.to_csv(risk),
+                           file_name="at_risk_students.csv", mime="text/csv")
+
+@dashboard_section("Forum Moderation")
+def admin_forum():
+    mod_q = st.text_input("Search forum", key="admin_forum_search")
+    if st.button("Search Forum"):
+        for p in search.search("forum", mod_q):
+            st.write(p)
+    if st.toggle("View Forum Posts"):
+        paged_view("admin_forum", "forum", "*", st.write)
+
+@dashboard_section("Elections")
+def admin_elections():
+    new_election = st.text_input("Election name", value="General")
+    new_position = st.text_input("Position (e.g. President)")
+    if st.button("Add Position"):
+        if new_election and new_position:
+            elections.add_position(new_election, new_position)
+            st.success("Position added")
+    result_for = st.selectbox("Results for", elections.positions(), format_func=lambda p: f"{p[0]} — {p[1]}")
+    # A primary-key range read on the tally, so live: positions come from the live database too.
+    if st.button("View Votes"):
+        for row in elections.results(*result_for):
+            st.write(f"{row[0]} : {row[1]} votes")
+
+@dashboard_section("Student Documents (Admin)")
+def admin_documents():
+    # Academic PDFs for any student
+    student_list = [s[0] for s in db.query("SELECT username FROM users WHERE role='Student'")]
+    selected_student = st.selectbox("Select student", [""] + student_list)
+    if selected_student:
+        if st.button("Generate Exam Card for student"):
+            pdf_bytes = documents.render("exam_card", selected_student)
+            st.download_button("Download Exam Card PDF", data=pdf_bytes, file_name=f"exam_card_{selected_student}.pdf")
+        if st.button("Generate Transcript for student"):
+            regs = db.query("SELECT course_code FROM registrations WHERE student=?", (selected_student,))
+            pdf_bytes = generate_pdf_bytes(documents.transcript_lines(selected_student, [r[0] for r in regs], datetime.now()))
+            st.download_button("Download Transcript PDF", data=pdf_bytes, file_name=f"transcript_{selected_student}.pdf")
+        if st.button("Generate Fee Statement for student"):
+            pdf_bytes = documents.render("fee_statement", selected_student)
+            st.download_button("Download Fee Statement PDF", data=pdf_bytes, file_name=f"fee_statement_{selected_student}.pdf")
+
+    # Whole-cohort documents, rendered in a process pool into a ZIP on disk
+    bulk_type = st.selectbox("Bulk document type", list(documents.DOC_TYPES),
+                             format_func=documents.DOC_TYPES.get)
+    if st.button("Generate for all students"):
+        bar = st.progress(0.0)
+        def report(done, total, rate):
+            bar.progress(done / total if total else 1.0, text=f"{done}/{total} documents — {rate:.1f} docs/s")
+        with report_data():
+            out_path, count, elapsed = documents.generate_cohort_zip(bulk_type, progress=report)
+        st.session_state["bulk_zip"] = out_path
+        st.success(f"Generated {count} documents in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f} docs/s)")
+    if st.session_state.get("bulk_zip"):
+        lazy_download("bulk_zip", st.session_state["bulk_zip"], os.path.basename(st.session_state["bulk_zip"]))
+
+@dashboard_section("Jobs & Library Admin")
+def admin_jobs_library():
+    # Job board & library (admin can add)
+    job_title = st.text_input("Job title")
+    job_company = st.text_input("Company")
+    job_descr = st.text_area("Description")
+    job_contact = st.text_input("Contact email/phone")
+    if st.button("Post Job"):
+        reference.execute("jobs", "INSERT INTO jobs (title, company, description, contact) VALUES (?, ?, ?, ?)",
+                          (job_title, job_company, job_descr, job_contact))
+        st.success("Job posted")
+    if st.button("View Jobs"):
+        for j in reference.query("jobs", "SELECT title, company, description, contact FROM jobs"):
+            st.write(j)
+
+    book_title = st.text_input("Book title")
+    book_author = st.text_input("Book author")
+    book_copies = st.number_input("Copies available", min_value=0, value=1)
+    if st.button("Add Book"):
+        reference.execute("library", "INSERT INTO library (title, author, available) VALUES (?, ?, ?)",
+                          (book_title, book_author, int(book_copies)))
+        st.success("Book added")
+    if st.button("View Library"):
+        for b in reference.query("library", "SELECT title, author, available FROM library"):
+            st.write(b)
+
+@dashboard_section("Caches")
+def admin_caches():
+    # Reference data cache (courses, exams, library, jobs) and rendered PDFs
+    if st.button("View Cache Stats"):
+        st.write("Reference data:", reference.stats())
+        st.write("Rendered PDFs:", documents.pdf_cache.stats())
+        st.write("Inbox counters:", inbox.watcher.stats())
+        if writebehind.ENABLED:
+            st.write("Write-behind queue:", writebehind.get_queue().stats())
+    if writebehind.ENABLED and writebehind.get_queue().failures:
+        st.warning(f"{writebehind.get_queue().failures} write-behind statements failed and were dropped "
+                   f"(details in the '{writebehind.log.name}' log).")
+    # Admin reports read a periodically refreshed copy of the database
+    if st.button("Refresh Reporting Snapshot"):
+        seconds = reporting.refresh()
+        st.success(f"Snapshot refreshed in {seconds:.1f}s")
+    st.caption(reporting.describe(reporting.current()))
+
+@dashboard_section("Performance")
+def admin_performance():
+    # Query, section, PDF and file I/O latency since the process started
+    st.caption(f"Queries slower than {metrics.SLOW_QUERY_MS:g} ms are also logged to '{metrics.slow_log.name}'.")
+    if st.toggle("View Performance Metrics"):
+        rows = metrics.registry.snapshot()
+        for kind in ("section", "query", "pdf", "file_io"):
+            kind_rows = [r for r in rows if r["kind"] == kind]
+            if kind_rows:
+                st.write(f"**{kind}** (slowest p95 first)")
+                st.dataframe(kind_rows, use_container_width=True)
+        st.download_button("Download Prometheus metrics", data=metrics.registry.prometheus(),
+                           file_name="myunispace_metrics.prom", mime="text/plain")
+        if st.button("Reset Metrics"):
+            metrics.registry.reset()
+            st.rerun(scope="fragment")
 
 # ---------------------- Streamlit App ----------------------
 st.set_page_config(page_title="MyUniSpace", layout="wide")
@@ -213,9 +701,8 @@ if 'username' not in st.session_state:
                 st.error("Username and password are required")
             else:
                 try:
-                    c.execute("INSERT INTO users (role, full_name, student_id, username, email, phone, password) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                              (role, full_name, student_id, username, email, phone, hash_password(password)))
-                    conn.commit()
+                    db.execute("INSERT INTO users (role, full_name, student_id, username, email, phone, password) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (role, full_name, student_id, username, email, phone, hash_password(password)))
                     st.success("Registered successfully — please login from the sidebar")
                 except Exception as e:
                     st.error("Could not register (maybe username exists).")
@@ -225,8 +712,7 @@ if 'username' not in st.session_state:
         username_input = st.text_input("Username")
         password_input = st.text_input("Password", type="password")
         if st.button("Login"):
-            c.execute("SELECT role, password FROM users WHERE username=?", (username_input,))
-            row = c.fetchone()
+            row = db.query_one("SELECT role, password FROM users WHERE username=?", (username_input,))
             if row and verify_password(password_input, row[1]):
                 st.session_state['username'] = username_input
                 st.session_state['role'] = row[0]
@@ -236,6 +722,8 @@ if 'username' not in st.session_state:
                 st.error("Invalid credentials")
 
 # MAIN DASHBOARD (for logged-in users)
+# Each section below is a fragment: a full script run renders them all, but an
+# interaction inside one section reruns only that section.
 if 'username' in st.session_state:
     username = st.session_state['username']
     role = st.session_state['role']
@@ -247,427 +735,52 @@ if 'username' in st.session_state:
     # COMMON QUICK LINKS
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Quick actions**")
-    if st.sidebar.button("My Inbox"):
-        st.experimental_set_query_params(view="inbox")
+    with st.sidebar:
+        inbox_badge(username)
     if st.sidebar.button("My Assignments"):
         st.query_params["view"] = "assignments"
 
     # ---------- STUDENT ----------
     if role == "Student":
         st.header(f"Student Dashboard — {username}")
-
-        # PROFILE & COURSES
-        st.subheader("Profile & Courses")
-        c.execute("SELECT full_name, student_id, email, phone FROM users WHERE username=?", (username,))
-        profile = c.fetchone()
-        st.write("Name:", profile[0] if profile else "")
-        st.write("Student ID:", profile[1] if profile else "")
-        st.write("Email:", profile[2] if profile else "")
-        st.write("Phone:", profile[3] if profile else "")
-
-        # REGISTER COURSE
-        st.subheader("Course Registration")
-        new_course = st.text_input("Course code to register (e.g. CS101)")
-        if st.button("Register Course"):
-            if new_course:
-                c.execute("INSERT INTO registrations (student, course_code) VALUES (?, ?)", (username, new_course))
-                conn.commit()
-                st.success(f"Registered {new_course}")
-
-        # VIEW REGISTERED COURSES
-        c.execute("SELECT course_code FROM registrations WHERE student=?", (username,))
-        reg_courses = [r[0] for r in c.fetchall()]
-        st.write("Registered courses:", reg_courses if reg_courses else "None")
-
-        # ASSIGNMENTS (upload + camera)
-        st.subheader("Assignments")
-        course_for_assign = st.selectbox("Select course", ["General"] + reg_courses, key="assign_course")
-        uploaded = st.file_uploader("Upload file for assignment", type=["pdf","docx","doc","jpg","png"])
-        cam = st.camera_input("Or capture image with camera")
-        if st.button("Submit Assignment"):
-            if uploaded:
-                path = save_uploaded_file(uploaded, username, course_for_assign)
-                st.success("Assignment uploaded: " + os.path.basename(path))
-            elif cam:
-                path = save_camera_image(cam, username)
-                st.success("Captured image saved as assignment: " + os.path.basename(path))
-            else:
-                st.error("Choose a file or capture an image.")
-
-        # VIEW & DOWNLOAD OWN ASSIGNMENTS
-        st.write("Your submissions:")
-        c.execute("SELECT id, course_code, filename, timestamp FROM assignments WHERE student=?", (username,))
-        assigns = c.fetchall()
-        for a in assigns:
-            st.write(f"{a[3]} | {a[1]} | {a[2]}")
-            file_path = os.path.join(UPLOAD_DIR, a[2])
-            if os.path.exists(file_path):
-                with open(file_path, "rb") as f:
-                    st.download_button(f"Download {a[2]}", data=f.read(), file_name=a[2])
-
-        # FEES & PAYMENTS
-        st.subheader("Fees & Payments")
-        amount = st.number_input("Amount (KES)", min_value=1.0, value=100.0, step=1.0)
-        if st.button("Pay (simulate M-Pesa)"):
-            status = mpesa_payment(username, amount)
-            st.success(f"Payment status: {status}")
-        if st.button("View Payments"):
-            c.execute("SELECT amount, status, timestamp FROM payments WHERE student=?", (username,))
-            pays = c.fetchall()
-            for p in pays:
-                st.write(f"{p[2]} | KES {p[0]} | {p[1]}")
-        if st.button("Download Fee Statement (PDF)"):
-            c.execute("SELECT amount, status, timestamp FROM payments WHERE student=?", (username,))
-            pays = c.fetchall()
-            lines = [f"Fee Statement for {username}", f"Generated: {datetime.now()}"]
-            for p in pays:
-                lines.append(f"{p[2]} | KES {p[0]} | {p[1]}")
-            pdf_bytes = generate_pdf_bytes(lines)
-            st.download_button("Download Fee Statement PDF", data=pdf_bytes, file_name=f"fee_statement_{username}.pdf")
-
-        # EXAMS & RESULTS
-        st.subheader("Exams & Results")
-        if st.button("View Exam Timetable"):
-            c.execute("SELECT course_code, exam_date, center FROM exams")
-            exams = c.fetchall()
-            if exams:
-                for ex in exams:
-                    st.write(f"{ex[0]} | {ex[1]} | {ex[2]}")
-            else:
-                st.info("No exams scheduled.")
-
-        if st.button("Generate Exam Card (PDF)"):
-            c.execute("SELECT course_code, exam_date, center FROM exams")
-            exams = c.fetchall()
-            lines = [f"Exam Card — {username}", f"Generated: {datetime.now()}"]
-            for ex in exams:
-                lines.append(f"{ex[0]} - {ex[1]} - {ex[2]}")
-            pdf_bytes = generate_pdf_bytes(lines)
-            st.download_button("Download Exam Card PDF", data=pdf_bytes, file_name=f"exam_card_{username}.pdf")
-
-        if st.button("View Results (sample)"):
-            # Random sample grades (demo)
-            c.execute("SELECT course_code FROM registrations WHERE student=?", (username,))
-            regs = c.fetchall()
-            if not regs:
-                st.info("No registered courses to show results.")
-            else:
-                for r in regs:
-                    st.write(f"{r[0]} : {random.choice(['A','B','C','D','E','F'])}")
-
-        # HOSTEL
-        st.subheader("Hostel")
-        pref_room = st.text_input("Preferred room number")
-        if st.button("Apply for Hostel"):
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            c.execute("INSERT INTO hostel (student, room_number, status, timestamp) VALUES (?, ?, ?, ?)",
-                      (username, pref_room, "Pending", timestamp))
-            conn.commit()
-            st.success("Hostel application submitted")
-        if st.button("View Hostel Application Status"):
-            c.execute("SELECT room_number, status, timestamp FROM hostel WHERE student=?", (username,))
-            apps = c.fetchall()
-            for a in apps:
-                st.write(f"{a[2]} | Room: {a[0]} | Status: {a[1]}")
-
-        # FORUM
-        st.subheader("Forum")
-        forum_post = st.text_area("Write a forum post")
-        if st.button("Post to Forum"):
-            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            c.execute("INSERT INTO forum (user, message, timestamp) VALUES (?, ?, ?)", (username, forum_post, ts))
-            conn.commit()
-            st.success("Posted")
-        if st.button("View Forum Posts"):
-            c.execute("SELECT user, message, timestamp FROM forum ORDER BY id DESC")
-            posts = c.fetchall()
-            for p in posts:
-                st.write(f"{p[2]} | {p[0]}: {p[1]}")
-
-        # ELECTIONS
-        st.subheader("Elections")
-        candidate = st.text_input("Candidate name to vote for")
-        if st.button("Vote"):
-            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            c.execute("INSERT INTO elections (student, candidate, timestamp) VALUES (?, ?, ?)", (username, candidate, ts))
-            conn.commit()
-            st.success("Vote recorded")
-
-        # MISC: Library & Jobs
-        st.subheader("Library")
-        q = st.text_input("Search library (title or author)")
-        if st.button("Search Library"):
-            c.execute("SELECT title, author, available FROM library WHERE title LIKE ? OR author LIKE ?", (f"%{q}%", f"%{q}%"))
-            books = c.fetchall()
-            for b in books:
-                st.write(f"{b[0]} by {b[1]} — Available: {b[2]}")
-
-        st.subheader("Jobs & Internships")
-        if st.button("View Job Board"):
-            c.execute("SELECT title, company, description, contact FROM jobs")
-            jobs = c.fetchall()
-            for j in jobs:
-                st.write(f"{j[0]} — {j[1]} | {j[2]} | Contact: {j[3]}")
-
-        # MESSAGES (quick)
-        st.subheader("Messaging")
-        to = st.text_input("Send message to (username)")
-        body = st.text_area("Message")
-        if st.button("Send"):
-            if to and body:
-                send_message(username, to, body)
-                st.success("Message sent")
+        student_profile(username)
+        student_registration(username)
+        student_assignments(username)
+        student_fees(username)
+        student_exams(username)
+        student_hostel(username)
+        student_forum(username)
+        student_elections(username)
+        student_library()
+        student_jobs()
+        inbox_section(username)
+        student_messaging(username)
 
     # ---------- LECTURER ----------
     elif role == "Lecturer":
         st.header(f"Lecturer Dashboard — {username}")
-
-        # Add / View Courses
-        st.subheader("Courses")
-        lec_course_code = st.text_input("Course Code")
-        lec_course_name = st.text_input("Course Name")
-        if st.button("Add Course"):
-            if lec_course_code and lec_course_name:
-                c.execute("INSERT INTO courses (course_code, course_name) VALUES (?, ?)", (lec_course_code, lec_course_name))
-                conn.commit()
-                st.success("Course added")
-
-        if st.button("View All Courses"):
-            c.execute("SELECT course_code, course_name FROM courses")
-            for course in c.fetchall():
-                st.write(course[0], "-", course[1])
-
-        # Post exams
-        st.subheader("Exams")
-        exam_course = st.text_input("Course Code for exam", key="lec_exam_course")
-        exam_date = st.date_input("Exam Date", key="lec_exam_date")
-        exam_center = st.text_input("Exam Center", key="lec_exam_center")
-        if st.button("Post Exam Schedule"):
-            c.execute("INSERT INTO exams (course_code, exam_date, center) VALUES (?, ?, ?)",
-                      (exam_course, str(exam_date), exam_center))
-            conn.commit()
-            st.success("Exam scheduled")
-
-        # View & grade assignments (simplified)
-        st.subheader("Assignments")
-        view_course = st.text_input("Course code to view submissions")
-        if st.button("View Submissions"):
-            c.execute("SELECT id, student, filename, timestamp FROM assignments WHERE course_code=?", (view_course,))
-            subs = c.fetchall()
-            if subs:
-                for s in subs:
-                    st.write(f"{s[3]} | {s[1]} | {s[2]}")
-                    fp = os.path.join(UPLOAD_DIR, s[2])
-                    if os.path.exists(fp):
-                        with open(fp, "rb") as f:
-                            st.download_button(f"Download {s[2]}", data=f.read(), file_name=s[2])
-            else:
-                st.info("No submissions")
-
-        # Attendance
-        st.subheader("Attendance")
-        att_student = st.text_input("Student username")
-        att_course = st.text_input("Course code")
-        att_status = st.selectbox("Status", ["Present", "Absent"])
-        if st.button("Mark Attendance"):
-            date = datetime.now().strftime("%Y-%m-%d")
-            c.execute("INSERT INTO attendance (student, course_code, date, status) VALUES (?, ?, ?, ?)",
-                      (att_student, att_course, date, att_status))
-            conn.commit()
-            st.success("Attendance recorded")
-
-        # Messaging & Inbox
-        st.subheader("Messaging")
-        to = st.text_input("Send message to (username)")
-        body = st.text_area("Message body")
-        if st.button("Send Message"):
-            if to and body:
-                send_message(username, to, body)
-                st.success("Message sent")
-        if st.button("View Inbox"):
-            c.execute("SELECT sender, message, timestamp FROM messages WHERE receiver=?", (username,))
-            msgs = c.fetchall()
-            for m in msgs:
-                st.write(f"{m[2]} | {m[0]}: {m[1]}")
+        lecturer_courses()
+        lecturer_exams()
+        lecturer_assignments()
+        lecturer_attendance()
+        lecturer_attendance_reports()
+        inbox_section(username)
+        lecturer_messaging(username)
 
     # ---------- ADMIN ----------
     elif role == "Admin":
         st.header(f"Admin Dashboard — {username}")
-
-        # Manage users
-        st.subheader("Users")
-        if st.button("View All Users"):
-            c.execute("SELECT id, role, username, full_name, email, phone FROM users")
-            for u in c.fetchall():
-                st.write(f"{u[0]} | {u[1]} | {u[2]} | {u[3]} | {u[4]} | {u[5]}")
-
-        # Manage courses
-        st.subheader("Courses")
-        new_code = st.text_input("Course code")
-        new_name = st.text_input("Course name")
-        if st.button("Create Course"):
-            if new_code and new_name:
-                c.execute("INSERT INTO courses (course_code, course_name) VALUES (?, ?)", (new_code, new_name))
-                conn.commit()
-                st.success("Course created")
-        if st.button("View Courses"):
-            c.execute("SELECT * FROM courses")
-            for row in c.fetchall():
-                st.write(row)
-
-        # Exams
-        st.subheader("Exams")
-        if st.button("View Exams"):
-            c.execute("SELECT * FROM exams")
-            for e in c.fetchall():
-                st.write(e)
-        # Create exam as admin
-        adm_ex_course = st.text_input("Exam course code (admin)")
-        adm_ex_date = st.date_input("Exam date (admin)")
-        adm_ex_center = st.text_input("Exam center (admin)")
-        if st.button("Create Exam (admin)"):
-            c.execute("INSERT INTO exams (course_code, exam_date, center) VALUES (?, ?, ?)",
-                      (adm_ex_course, str(adm_ex_date), adm_ex_center))
-            conn.commit()
-            st.success("Exam created")
-
-        # Payments
-        st.subheader("Payments")
-        if st.button("View All Payments"):
-            c.execute("SELECT * FROM payments")
-            for p in c.fetchall():
-                st.write(p)
-
-        # Assignments
-        st.subheader("Assignments")
-        if st.button("View All Assignments"):
-            c.execute("SELECT * FROM assignments ORDER BY id DESC")
-            for a in c.fetchall():
-                st.write(a)
-                fp = os.path.join(UPLOAD_DIR, a[3])
-                if os.path.exists(fp):
-                    with open(fp, "rb") as f:
-                        st.download_button(f"Download {a[3]}", data=f.read(), file_name=a[3])
-
-        # Hostel
-        st.subheader("Hostel applications")
-        if st.button("View Hostels"):
-            c.execute("SELECT * FROM hostel")
-            for h in c.fetchall():
-                st.write(h)
-        if st.button("Approve all pending hostels (demo)"):
-            c.execute("UPDATE hostel SET status='Approved' WHERE status='Pending'")
-            conn.commit()
-            st.success("All pending hostel applications approved (demo)")
-
-        # Forum
-        st.subheader("Forum Moderation")
-        if st.button("View Forum Posts"):
-            c.execute("SELECT * FROM forum ORDER BY id DESC")
-            for p in c.fetchall():
-                st.write(p)
-
-        # Elections
-        st.subheader("Elections")
-        if st.button("View Votes"):
-            c.execute("SELECT candidate, count(*) FROM elections GROUP BY candidate")
-            for row in c.fetchall():
-                st.write(f"{row[0]} : {row[1]} votes")
-
-        # Academic PDFs for any student
-        st.subheader("Student Documents (Admin)")
-        c.execute("SELECT username FROM users WHERE role='Student'")
-        student_list = [s[0] for s in c.fetchall()]
-        selected_student = st.selectbox("Select student", [""] + student_list)
-        if selected_student:
-            if st.button("Generate Exam Card for student"):
-                c.execute("SELECT course_code, exam_date, center FROM exams")
-                exams = c.fetchall()
-                lines = [f"Exam Card for {selected_student}", f"Generated: {datetime.now()}"]
-                for ex in exams:
-                    lines.append(f"{ex[0]} - {ex[1]} - {ex[2]}")
-                pdf_bytes = generate_pdf_bytes(lines)
-                st.download_button("Download Exam Card PDF", data=pdf_bytes, file_name=f"exam_card_{selected_student}.pdf")
-            if st.button("Generate Transcript for student"):
-                c.execute("SELECT course_code FROM registrations WHERE student=?", (selected_student,))
-                regs = c.fetchall()
-                lines = [f"Transcript for {selected_student}", f"Generated: {datetime.now()}"]
-                for r in regs:
-                    lines.append(f"{r[0]} : {random.choice(['A','B','C','D','E'])}")
-                pdf_bytes = generate_pdf_bytes(lines)
-                st.download_button("Download Transcript PDF", data=pdf_bytes, file_name=f"transcript_{selected_student}.pdf")
-            if st.button("Generate Fee Statement for student"):
-                c.execute("SELECT amount, status, timestamp FROM payments WHERE student=?", (selected_student,))
-                pays = c.fetchall()
-                lines = [f"Fee Statement for {selected_student}", f"Generated: {datetime.now()}"]
-                for p in pays:
-                    lines.append(f"{p[2]} | KES {p[0]} | {p[1]}")
-                pdf_bytes = generate_pdf_bytes(lines)
-                st.download_button("Download Fee Statement PDF", data=pdf_bytes, file_name=f"fee_statement_{selected_student}.pdf")
-
-        # Job board & library (admin can add)
-        st.subheader("Jobs & Library Admin")
-        job_title = st.text_input("Job title")
-        job_company = st.text_input("Company")
-        job_descr = st.text_area("Description")
-        job_contact = st.text_input("Contact email/phone")
-        if st.button("Post Job"):
-            c.execute("INSERT INTO jobs (title, company, description, contact) VALUES (?, ?, ?, ?)",
-                      (job_title, job_company, job_descr, job_contact))
-            conn.commit()
-            st.success("Job posted")
-        if st.button("View Jobs"):
-            c.execute("SELECT title, company, description, contact FROM jobs")
-            for j in c.fetchall():
-                st.write(j)
-
-        book_title = st.text_input("Book title")
-        book_author = st.text_input("Book author")
-        book_copies = st.number_input("Copies available", min_value=0, value=1)
-        if st.button("Add Book"):
-            c.execute("INSERT INTO library (title, author, available) VALUES (?, ?, ?)",
-                      (book_title, book_author, int(book_copies)))
-            conn.commit()
-            st.success("Book added")
-        if st.button("View Library"):
-            c.execute("SELECT title, author, available FROM library")
-            for b in c.fetchall():
-                st.write(b)
-
-    # Refresh commit
-    conn.commit()
-
-    
-
-    
-
-   
-
-
-   
-       
-            
-           
-
-        
-      
-          
-        
-
-        
-
-
-    
-   
-           
-            
-           
-                
-   
-        
-        
-                
-       
-              
-        
-                
+        admin_users()
+        admin_courses()
+        admin_exams()
+        admin_payments()
+        admin_assignments()
+        admin_hostel()
+        admin_attendance()
+        admin_forum()
+        admin_elections()
+        admin_documents()
+        admin_jobs_library()
+        admin_caches()
+        admin_performance()
+        inbox_section(username)
@@ -0,0 +1,61 @@
+# attendance.py
+"""Roster-based attendance marking.
+
+A whole session is written with one executemany in a single transaction, as
+an upsert on (student, course_code, date), so re-marking a day overwrites
+that day's rows instead of duplicating them.
+"""
+import csv
+import io
+from datetime import datetime
+
+import db
+
+STATUSES = ("Present", "Absent")
+
+UPSERT = """INSERT INTO attendance (student, course_code, date, status) VALUES (?, ?, ?, ?)
+    ON CONFLICT (student, course_code, date) DO UPDATE SET status = excluded.status"""
+
+def today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+def roster(course_code):
+    """Usernames of every student registered for ``course_code``."""
+    return [r[0] for r in db.query(
+        "SELECT student FROM registrations WHERE course_code=? ORDER BY student", (course_code,))]
+
+def record(rows):
+    """Upsert ``(student, course_code, date, status)`` rows in one transaction."""
+    rows = list(rows)
+    for row in rows:
+        if row[3] not in STATUSES:
+            raise ValueError(f"invalid status {row[3]!r} for {row[0]}")
+    with db.transaction(write=True) as conn:
+        conn.executemany(UPSERT, rows)
+    return len(rows)
+
+def mark_session(course_code, date, students, absent=()):
+    """Mark every student in ``students`` Present except those in ``absent``."""
+    absent = set(absent)
+    return record((s, course_code, date, "Absent" if s in absent else "Present") for s in students)
+
+def parse_csv(data, course_code=None, date=None):
+    """Read attendance rows from CSV text or bytes.
+
+    Columns: ``student``, ``status`` and optionally ``course_code`` and
+    ``date``; missing ones fall back to the arguments (date: today).
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    rows = []
+    for n, rec in enumerate(csv.DictReader(io.StringIO(data)), start=2):
+        student = (rec.get("student") or "").strip()
+        status = (rec.get("status") or "").strip().capitalize()
+        code = (rec.get("course_code") or course_code or "").strip()
+        day = (rec.get("date") or date or today()).strip()
+        if not student or not code:
+            raise ValueError(f"line {n}: student and course_code are required")
+        if status not in STATUSES:
+            raise ValueError(f"line {n}: status must be one of {', '.join(STATUSES)}")
+        rows.append((student, code, day, status))
+    return rows
@@ -0,0 +1,81 @@
+# benchmarks/bench_attendance.py
+"""Attendance reports from the rollups vs aggregating the raw attendance rows.
+
+    python -m benchmarks.bench_attendance [--students 5000] [--courses 100] [--days 60]
+
+Each student takes 5 courses; every course meets on each of --days dates, so
+the defaults write 1.5M attendance rows (through the rollup triggers).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import analytics
+import attendance
+import db
+
+
+def timed(fn, runs=3):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs * 1000, result
+
+
+def raw_at_risk(threshold=analytics.AT_RISK_RATE, min_sessions=analytics.MIN_SESSIONS):
+    # What a report without rollups has to do: aggregate every row, then loop.
+    rows = db.query("SELECT course_code, student, sum(status = 'Present'), count(*) FROM attendance "
+                    "GROUP BY course_code, student")
+    return [(c, s, p / n) for c, s, p, n in rows if n >= min_sessions and p / n < threshold]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = random.Random(21)
+    codes = [f"C{i:03d}" for i in range(args.courses)]
+    enrolment = {f"s{i:05d}": rng.sample(codes, 5) for i in range(args.students)}
+    # A tenth of students attend rarely, so the at-risk list is not empty.
+    likelihood = {s: 0.5 if rng.random() < 0.1 else 0.92 for s in enrolment}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "bench.db"), os.path.join(tmp, "uploads"))
+        start = time.perf_counter()
+        written = 0
+        for day in range(args.days):
+            date = f"2024-{1 + day // 28:02d}-{1 + day % 28:02d}"
+            written += attendance.record(
+                (s, c, date, "Present" if rng.random() < likelihood[s] else "Absent")
+                for s, courses in enrolment.items() for c in courses)
+        load_s = time.perf_counter() - start
+        print(f"{written} attendance rows written in {load_s:.1f}s ({written / load_s:,.0f} rows/s, rollup triggers on)")
+
+        course = codes[0]
+        rows = [
+            ("course per-student report", lambda: analytics.student_rates(course),
+             lambda: db.query("SELECT student, sum(status = 'Present'), count(*) FROM attendance "
+                              "WHERE course_code=? GROUP BY student", (course,))),
+            ("course session trend", lambda: analytics.session_rates(course),
+             lambda: db.query("SELECT date, sum(status = 'Present'), count(*) FROM attendance "
+                              "WHERE course_code=? GROUP BY date", (course,))),
+            ("at-risk, all courses", analytics.at_risk, raw_at_risk),
+            ("rates by course", analytics.course_rates,
+             lambda: db.query("SELECT course_code, count(DISTINCT student), sum(status = 'Present'), count(*) "
+                              "FROM attendance GROUP BY course_code")),
+        ]
+        print(f"{'report':<28} {'rollups ms':>11} {'raw rows ms':>12}")
+        for name, fast, slow in rows:
+            fast_ms, result = timed(fast)
+            slow_ms, _ = timed(slow, runs=1)
+            print(f"{name:<28} {fast_ms:11.1f} {slow_ms:12.1f}   ({len(result)} rows)")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
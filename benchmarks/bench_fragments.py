@@ -0,0 +1,117 @@
+# benchmarks/bench_fragments.py
+"""Queries and wall time per dashboard interaction: whole script vs one fragment.
+
+    python -m benchmarks.bench_fragments [--students 2000] [--runs 5]
+
+Drives app.py through streamlit's AppTest against a seeded database. For each
+click it reports the queries and wall time of the script run AppTest made
+(every section, which is what a click cost before the dashboards were split
+into fragments) next to those of the clicked section alone (what the same
+click costs with the section as an ``st.fragment``).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import db
+import metrics
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# (role, section title, button label)
+INTERACTIONS = [
+    ("Student", "Fees & Payments", "View Payments"),
+    ("Student", "Exams & Results", "View Exam Timetable"),
+    ("Student", "Hostel", "View Hostel Application Status"),
+    ("Student", "Forum", "Search Forum"),
+    ("Student", "Jobs & Internships", "View Job Board"),
+    ("Lecturer", "Courses", "View All Courses"),
+    ("Admin", "Hostel applications", "View Hostels"),
+    ("Admin", "Elections", "View Votes"),
+    ("Admin", "Caches", "View Cache Stats"),
+]
+USERS = {"Student": "bench_student", "Lecturer": "bench_lecturer", "Admin": "bench_admin"}
+
+
+def seed(students):
+    rng = random.Random(17)
+    courses = [f"C{i:03d}" for i in range(40)]
+    db.executemany("INSERT INTO users (role, full_name, username, password) VALUES (?, ?, ?, '')",
+                   [(role, username, username) for role, username in USERS.items()] +
+                   [("Student", f"Student {i}", f"s{i:05d}") for i in range(students)])
+    db.executemany("INSERT OR IGNORE INTO registrations (student, course_code) VALUES (?, ?)",
+                   ((f"s{i:05d}", c) for i in range(students) for c in rng.sample(courses, 5)))
+    db.executemany("INSERT INTO registrations (student, course_code) VALUES (?, ?)",
+                   ((USERS["Student"], c) for c in courses[:6]))
+    db.executemany("INSERT INTO forum (user, message, timestamp) VALUES (?, ?, '2024-01-01 00:00:00')",
+                   ((f"s{i % students:05d}", f"post {i} about exams and hostels") for i in range(students * 5)))
+    db.executemany("INSERT INTO hostel (student, room_number, status, timestamp) VALUES (?, ?, 'Pending', '2024-01-01 00:00:00')",
+                   ((f"s{i:05d}", str(i % 300)) for i in range(students)))
+    db.executemany("INSERT INTO payments (student, amount, status, timestamp) VALUES (?, 100, 'Completed', '2024-01-01 00:00:00')",
+                   ((USERS["Student"],) for _ in range(50)))
+
+
+def totals():
+    return {(r["kind"], r["name"]): (r["calls"], r["total_ms"], r["rows"]) for r in metrics.registry.snapshot()}
+
+
+def click(at, label):
+    button = next(b for b in at.button if b.label == label)
+    before = totals()
+    start = time.perf_counter()
+    button.click().run()
+    wall_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise SystemExit(f"app raised while clicking {label!r}: {at.exception}")
+    after = totals()
+    queries = sum(calls - before.get(key, (0, 0, 0))[0]
+                  for key, (calls, _, _) in after.items() if key[0] == "query")
+    return wall_ms, queries, after, before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, os.path.dirname(APP))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # app.py opens its database relative to the working directory
+        try:
+            pool = db.init(db.DB_FILE, db.UPLOAD_DIR)
+            seed(args.students)
+            pool.close()
+
+            print(f"{args.students} students, mean of {args.runs} clicks")
+            print(f"{'interaction':<46} {'script q':>9} {'script ms':>10} {'section q':>10} {'section ms':>11}")
+            for role, title, label in INTERACTIONS:
+                at = AppTest.from_file(APP, default_timeout=120)
+                at.session_state["username"] = USERS[role]
+                at.session_state["role"] = role
+                at.run()
+                sums = [0.0, 0, 0.0, 0]
+                for _ in range(args.runs):
+                    wall_ms, queries, after, before = click(at, label)
+                    key = ("section", f"{role}/{title}")
+                    _, old_ms, old_rows = before.get(key, (0, 0, 0))
+                    _, new_ms, new_rows = after[key]
+                    sums[0] += wall_ms
+                    sums[1] += queries
+                    sums[2] += new_ms - old_ms
+                    sums[3] += new_rows - old_rows
+                n = args.runs
+                print(f"{role + ' / ' + label:<46} {sums[1] / n:9.1f} {sums[0] / n:10.1f} "
+                      f"{sums[3] / n:10.1f} {sums[2] / n:11.1f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_group_commit.py
+"""Per-statement commits vs write-behind group commit.
+
+    python -m benchmarks.bench_group_commit [--threads 16] [--inserts 1000] [--synchronous FULL]
+
+Each thread inserts messages; "per-statement" commits every insert through
+db.execute, "group commit" queues them on a WriteBehindQueue and flushes.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import db
+import writebehind
+
+SQL = "INSERT INTO messages (sender, receiver, message, timestamp) VALUES (?, ?, ?, ?)"
+
+
+def run(threads, inserts, write):
+    def worker(n):
+        for i in range(inserts):
+            write(SQL, (f"user{n}", f"user{i % 50}", f"message {i}", "2024-01-01 00:00:00"))
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--inserts", type=int, default=1000, help="inserts per thread")
+    parser.add_argument("--synchronous", choices=["OFF", "NORMAL", "FULL"], default="NORMAL")
+    args = parser.parse_args()
+    db.PRAGMAS = [p for p in db.PRAGMAS if "synchronous" not in p] + [f"PRAGMA synchronous={args.synchronous}"]
+    total = args.threads * args.inserts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "per_statement.db"), os.path.join(tmp, "uploads"), pool_size=args.threads)
+        start = run(args.threads, args.inserts, db.execute)
+        per_statement = time.perf_counter() - start
+        pool.close()
+
+        pool = db.init(os.path.join(tmp, "group.db"), os.path.join(tmp, "uploads"), pool_size=args.threads)
+        q = writebehind.WriteBehindQueue()
+        start = run(args.threads, args.inserts, q.submit)
+        enqueued = time.perf_counter() - start
+        q.flush()
+        grouped = time.perf_counter() - start
+        stats = q.stats()
+        q.close()
+        assert db.query_one("SELECT count(*) FROM messages")[0] == total
+        pool.close()
+
+    print(f"{total} inserts from {args.threads} threads, synchronous={args.synchronous}")
+    print(f"per-statement commit: {per_statement:6.2f}s  {total / per_statement:9.0f} inserts/s")
+    print(f"group commit:         {grouped:6.2f}s  {total / grouped:9.0f} inserts/s "
+          f"(producers done after {enqueued:.2f}s, {stats['batches']} batches, avg {stats['avg_batch']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_images.py
+"""Camera capture uploads with background transcoding vs transcoding inline.
+
+    python -m benchmarks.bench_images [--captures 200] [--students 50]
+
+Captures are 1280x720 PNGs of noisy "paper" with lines of text, roughly what
+st.camera_input returns for handwritten work. Reports upload latency as the
+student sees it, how long the worker pool takes to drain, and the storage
+saved. Needs Pillow.
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import db
+import images
+from helpers import save_camera_image
+
+
+def capture(rng):
+    from PIL import Image, ImageDraw, ImageFilter
+
+    paper = Image.new("RGB", (1280, 720), (235, 230, 220))
+    image = Image.blend(paper, Image.effect_noise((1280, 720), 12).convert("RGB"), 0.15)
+    draw = ImageDraw.Draw(image)
+    for y in range(0, 720, 24):
+        draw.text((20 + rng.randrange(10), y), f"Question {y // 24}: working " * 5, fill=(30, 30, 60))
+    buf = io.BytesIO()
+    image.filter(ImageFilter.GaussianBlur(0.6)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def upload_ms(payloads, students, inline):
+    latencies = []
+    for i, payload in enumerate(payloads):
+        start = time.perf_counter()
+        save_camera_image(io.BytesIO(payload), f"s{i % students:04d}")
+        if inline:
+            images.get_processor().wait()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--captures", type=int, default=200)
+    parser.add_argument("--students", type=int, default=50)
+    args = parser.parse_args()
+    if not images.available():
+        raise SystemExit("bench_images needs Pillow: pip install pillow")
+
+    rng = random.Random(25)
+    payloads = [capture(rng) for _ in range(args.captures)]
+    print(f"{args.captures} captures, {statistics.mean(map(len, payloads)) / 1e6:.2f} MB average PNG, "
+          f"{images.WORKERS} workers, {images.FORMAT} quality {images.QUALITY}")
+    print(f"{'mode':<22} {'p50 ms':>8} {'p95 ms':>8} {'drain s':>8}")
+    cwd = os.getcwd()
+    for name, inline in (("transcode inline", True), ("background pool", False)):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)  # uploads go to the default, relative, upload dir
+            try:
+                pool = db.init(db.DB_FILE, db.UPLOAD_DIR)
+                start = time.perf_counter()
+                latencies = sorted(upload_ms(payloads, args.students, inline))
+                images.get_processor().wait()
+                drain = time.perf_counter() - start
+                saved = images.savings()
+                pool.close()
+            finally:
+                os.chdir(cwd)
+        print(f"{name:<22} {statistics.median(latencies):8.1f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1]:8.1f} {drain:8.1f}")
+    print(f"stored {saved['stored_bytes'] / 1e6:.1f} MB for {saved['original_bytes'] / 1e6:.1f} MB of captures "
+          f"({saved['saved_pct']}% saved)")
+
+
+if __name__ == "__main__":
+    main()
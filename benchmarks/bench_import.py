@@ -0,0 +1,49 @@
+# benchmarks/bench_import.py
+"""Bulk import of a synthetic intake through manage.import_file.
+
+    python -m benchmarks.bench_import [--students 100000] [--batch-size 10000]
+
+Imports the same CSV with inline hashing and with the process pool, then
+exports the table back out as CSV.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import db
+import manage
+
+
+def write_intake(path, students):
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["role", "full_name", "student_id", "username", "email", "phone", "password"])
+        for i in range(students):
+            w.writerow(["Student", f"Student {i}", f"ADM/{i:06d}", f"student{i}",
+                        f"student{i}@uni.example", f"07{i:08d}", f"secret-{i}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=manage.BATCH_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        intake = os.path.join(tmp, "intake.csv")
+        write_intake(intake, args.students)
+        for label, workers in (("inline hashing", 0), ("process pool", -1)):
+            pool = db.init(os.path.join(tmp, f"{workers}.db"), os.path.join(tmp, "uploads"))
+            read, inserted, elapsed = manage.import_file("users", intake, args.batch_size, workers)
+            print(f"import ({label:>14}): {inserted} users in {elapsed:6.2f}s  {read / elapsed:9.0f} rows/s")
+            start = time.perf_counter()
+            count = manage.export_table("users", os.path.join(tmp, "users.csv"), "csv", args.batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"export (csv):            {count} users in {elapsed:6.2f}s  {count / elapsed:9.0f} rows/s")
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
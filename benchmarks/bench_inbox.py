@@ -0,0 +1,63 @@
+# benchmarks/bench_inbox.py
+"""Inbox polling: re-reading the whole inbox vs counters and since-id fetches.
+
+    python -m benchmarks.bench_inbox [--users 2000] [--messages 200] [--polls 5000]
+
+Every poll is for a random user. "full inbox" is what View Inbox did before
+(every message for the receiver); "counter poll" is the sidebar badge, with
+no writes in between and then right after a message is sent (insert included);
+"since-id fetch" loads the messages newer than what the session already has.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db
+import inbox
+
+
+def timed(fn, polls):
+    start = time.perf_counter()
+    for _ in range(polls):
+        fn()
+    return (time.perf_counter() - start) / polls * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(23)
+    users = [f"u{i:05d}" for i in range(args.users)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "bench.db"), os.path.join(tmp, "uploads"))
+        db.executemany("INSERT INTO messages (sender, receiver, message, timestamp) VALUES (?, ?, ?, '2024-01-01 00:00:00')",
+                       ((rng.choice(users), u, f"message {n} " + "x" * 100) for n in range(args.messages) for u in users))
+        print(f"{args.users} users x {args.messages} messages, mean of {args.polls} polls")
+        newest = {u: last for u, last in db.query("SELECT username, last_id FROM inbox_counters")}
+
+        def send_then_poll():
+            db.execute("INSERT INTO messages (sender, receiver, message, timestamp) VALUES ('bench', ?, 'ping', "
+                       "'2024-01-02 00:00:00')", (rng.choice(users),))
+            inbox.counters(rng.choice(users))
+
+        rows = [
+            ("full inbox", lambda: db.query("SELECT sender, message, timestamp FROM messages WHERE receiver=?",
+                                            (rng.choice(users),))),
+            ("counter poll, idle", lambda: inbox.counters(rng.choice(users))),
+            ("send + counter poll", send_then_poll),
+            ("since-id fetch", lambda: inbox.since(u := rng.choice(users), newest[u] - 2)),
+        ]
+        for name, fn in rows:
+            print(f"{name:<22} {timed(fn, args.polls):9.1f} µs/poll")
+        print("watcher:", inbox.watcher.stats())
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_pagination.py
+"""Full-table fetch vs keyset paging on a seeded forum table.
+
+    python -m benchmarks.bench_pagination [--rows 100000] [--runs 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import db
+
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "bench.db"), os.path.join(tmp, "uploads"))
+        db.executemany("INSERT INTO forum (user, message, timestamp) VALUES (?, ?, ?)",
+                       ((f"user{i % 500}", f"post number {i} " + "x" * 80, "2024-01-01 00:00:00")
+                        for i in range(args.rows)))
+
+        full_ms, rows = timed(lambda: db.query("SELECT user, message, timestamp FROM forum ORDER BY id DESC"), args.runs)
+        full_bytes = sum(len(r[0]) + len(r[1]) + len(r[2]) for r in rows)
+
+        first_ms, (page, cursor) = timed(lambda: db.fetch_page("forum", "user, message, timestamp"), args.runs)
+        page_bytes = sum(len(r[0]) + len(r[1]) + len(r[2]) for r in page)
+
+        deep_cursor = args.rows // 2
+        deep_ms, _ = timed(lambda: db.fetch_page("forum", "user, message, timestamp", cursor=deep_cursor), args.runs)
+        offset_ms, _ = timed(lambda: db.query("SELECT user, message, timestamp FROM forum ORDER BY id DESC LIMIT ? OFFSET ?",
+                                              (db.PAGE_SIZE, args.rows // 2)), args.runs)
+        pool.close()
+
+    print(f"{args.rows} forum rows, page size {db.PAGE_SIZE}")
+    print(f"full fetch:              {full_ms:9.3f} ms  {len(rows):>7} rows  {full_bytes / 1e6:7.2f} MB")
+    print(f"keyset first page:       {first_ms:9.3f} ms  {len(page):>7} rows  {page_bytes / 1e6:7.3f} MB")
+    print(f"keyset page mid-table:   {deep_ms:9.3f} ms")
+    print(f"OFFSET page mid-table:   {offset_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
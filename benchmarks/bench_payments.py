@@ -0,0 +1,75 @@
+# benchmarks/bench_payments.py
+"""Throughput and tail latency of the payment pipeline against gateway_stub.
+
+    python -m benchmarks.bench_payments [--payments 2000] [--latency 1.0] [--failure-rate 0.2]
+
+Starts the stub HTTP gateway in-process, submits payments as fast as possible
+and reports submit latency (what the UI thread waits for) and end-to-end
+resolution latency (submit until SUCCESS/FAILED/TIMEOUT is stored).
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import db
+import payments
+from gateway_stub import SimulatedGateway, make_server
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+    return f"p50 {pick(0.50):8.2f} ms  p95 {pick(0.95):8.2f} ms  p99 {pick(0.99):8.2f} ms  max {values[-1] * 1000:8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=payments.WORKERS)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    server = make_server(port=0, gateway=SimulatedGateway(args.latency, 0.5, args.failure_rate), error_rate=args.error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "payments.db"), os.path.join(tmp, "uploads"), pool_size=args.workers + 4)
+        gateway = payments.HttpGateway(f"http://127.0.0.1:{server.server_port}")
+        processor = payments.PaymentProcessor(gateway, workers=args.workers, poll_interval=args.poll_interval)
+
+        submitted = {}
+        submit_times = []
+        start = time.perf_counter()
+        for i in range(args.payments):
+            t0 = time.perf_counter()
+            payment_id, _ = processor.submit(f"student{i % 500}", 100.0, f"bench-{i}")
+            submit_times.append(time.perf_counter() - t0)
+            submitted[payment_id] = t0
+
+        resolved = {}
+        while len(resolved) < len(submitted):
+            now = time.perf_counter()
+            for payment_id, status in db.query("SELECT id, status FROM payments WHERE status != 'PENDING'"):
+                if payment_id not in resolved:
+                    resolved[payment_id] = (now - submitted[payment_id], status)
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        processor.shutdown()
+        pool.close()
+    server.shutdown()
+
+    outcomes = {}
+    for _, status in resolved.values():
+        outcomes[status] = outcomes.get(status, 0) + 1
+    print(f"{args.payments} payments resolved in {elapsed:.2f}s ({args.payments / elapsed:.0f}/s), outcomes {outcomes}")
+    print(f"submit (UI thread):   {percentiles(submit_times)}")
+    print(f"end-to-end:           {percentiles([v[0] for v in resolved.values()])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_reporting.py
+"""Student write latency while a heavy admin report runs, live vs on the reporting snapshot.
+
+    python -m benchmarks.bench_reporting [--payments 2000000] [--seconds 5] [--tolerance 2.0]
+
+A writer thread inserts one payment every 2 ms through db.execute, like
+students paying during registration week, and records each commit's latency.
+It runs three times for --seconds each: alone, next to report threads
+looping full-table aggregates over payments on the live database, and next
+to the same reports inside reporting.reads(). Exits 1 if p99 latency beside
+the snapshot report exceeds --tolerance times the idle p99 (plus 2 ms of
+timer noise), so it can run as a check.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import db
+import reporting
+
+REPORT = ("SELECT student, count(*), sum(amount), max(timestamp) FROM payments "
+          "GROUP BY student ORDER BY sum(amount) DESC LIMIT 100")
+
+
+def writer(seconds, latencies):
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        db.execute("INSERT INTO payments (student, amount, status, timestamp) VALUES (?, 100, 'SUCCESS', "
+                   "'2024-09-01 08:00:00')", (f"writer{n % 500:03d}",))
+        latencies.append((time.perf_counter() - start) * 1000)
+        n += 1
+        time.sleep(0.002)
+
+
+def reports(stop, snapshot, counter):
+    while not stop.is_set():
+        if snapshot:
+            with reporting.reads():
+                db.query(REPORT)
+        else:
+            db.query(REPORT)
+        counter.append(1)
+
+
+def phase(name, seconds, report_threads, snapshot=False):
+    latencies, done, stop = [], [], threading.Event()
+    threads = [threading.Thread(target=reports, args=(stop, snapshot, done)) for _ in range(report_threads)]
+    for t in threads:
+        t.start()
+    writer(seconds, latencies)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<26} {len(latencies):7d} {p50:8.2f} {p99:8.2f} {latencies[-1]:8.2f} {len(done):8d}")
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=2_000_000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--report-threads", type=int, default=2)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "bench.db"), os.path.join(tmp, "uploads"))
+        db.executemany("INSERT INTO payments (student, amount, status, timestamp) VALUES (?, ?, 'SUCCESS', "
+                       "'2024-01-01 08:00:00')",
+                       ((f"student{i % 20000:05d}", float(i % 997)) for i in range(args.payments)))
+        elapsed = reporting.refresh()
+        print(f"{args.payments} payments; snapshot copied in {elapsed:.2f}s")
+        print(f"{'writes alongside':<26} {'writes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'reports':>8}")
+        idle = phase("nothing", args.seconds, 0)
+        live = phase("report on live database", args.seconds, args.report_threads)
+        snap = phase("report on snapshot", args.seconds, args.report_threads, snapshot=True)
+        pool.close()
+
+    limit = idle * args.tolerance + 2.0
+    print(f"p99 beside snapshot report {snap:.2f} ms, limit {limit:.2f} ms "
+          f"(live report p99 {live:.2f} ms)")
+    if snap > limit:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_search.py
+"""LIKE '%q%' scan vs FTS5 search on a seeded library catalogue.
+
+    python -m benchmarks.bench_search [--rows 1000000] [--runs 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db
+import search
+
+WORDS = ("algebra calculus database systems network security compiler design operating "
+         "theory discrete graph learning machine vision signal circuits physics chemistry "
+         "biology economics finance marketing history literature philosophy ethics law").split()
+AUTHORS = ["Rosen", "Kleinberg", "Elmasri", "Tanenbaum", "Knuth", "Sedgewick", "Cormen", "Date"]
+
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "bench.db"), os.path.join(tmp, "uploads"))
+        start = time.perf_counter()
+        db.executemany("INSERT INTO library (title, author, available) VALUES (?, ?, ?)",
+                       ((" ".join(rng.sample(WORDS, 3)).title() + f" Vol {i}", rng.choice(AUTHORS), rng.randint(0, 5))
+                        for i in range(args.rows)))
+        print(f"seeded {args.rows} books (with FTS triggers) in {time.perf_counter() - start:.1f}s")
+
+        for q in ("compiler", "knuth", "secur"):
+            like_ms, like_rows = timed(lambda: db.query(
+                "SELECT title, author, available FROM library WHERE title LIKE ? OR author LIKE ?",
+                (f"%{q}%", f"%{q}%")), args.runs)
+            fts_ms, fts_rows = timed(lambda: search.search("library", q), args.runs)
+            print(f"{q!r:>12}: LIKE {like_ms:9.2f} ms ({len(like_rows)} rows)   "
+                  f"FTS top-50 {fts_ms:8.2f} ms ({len(fts_rows)} rows)")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_timetable.py
+"""Validate a whole exam timetable, one day of it, and a newly posted exam.
+
+    python -m benchmarks.bench_timetable [--students 50000] [--courses 3000] [--days 20] [--centers 60]
+
+Each student registers on six courses; every course has one exam in one of
+four partly overlapping sessions a day, in a random centre. The baseline
+finds clashes with a self-join of registrations (every pair of a student's
+exams) and checks capacity with one overlap query per exam.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db
+import timetable
+
+SESSIONS = [("09:00", "12:00"), ("11:00", "13:00"), ("14:00", "17:00"), ("16:00", "18:00")]
+
+PAIRWISE = """SELECT a.student, ea.course_code, eb.course_code
+    FROM registrations AS a
+    JOIN registrations AS b ON b.student = a.student AND b.course_code > a.course_code
+    JOIN exams AS ea ON ea.course_code = a.course_code
+    JOIN exams AS eb ON eb.course_code = b.course_code
+    WHERE eb.exam_date = ea.exam_date AND eb.start_time < ea.end_time AND ea.start_time < eb.end_time"""
+
+
+def seed(students, courses, days, centers, rng):
+    codes = [f"C{i:04d}" for i in range(courses)]
+    halls = [f"Hall {i:02d}" for i in range(centers)]
+    db.executemany("INSERT INTO registrations (student, course_code) VALUES (?, ?)",
+                   ((f"s{i:05d}", c) for i in range(students) for c in rng.sample(codes, 6)))
+    exams = []
+    for c in codes:
+        start, end = rng.choice(SESSIONS)
+        exams.append((c, f"2024-06-{1 + rng.randrange(days):02d}", start, end, rng.choice(halls)))
+    db.executemany("INSERT INTO exams (course_code, exam_date, start_time, end_time, center) VALUES (?, ?, ?, ?, ?)",
+                   exams)
+    db.executemany("INSERT INTO exam_centers (center, capacity) VALUES (?, ?)", ((h, 150) for h in halls))
+    return exams
+
+
+def baseline():
+    clashes = db.query(PAIRWISE)
+    capacity = dict(timetable.centers())
+    overloads = []
+    for course, date, start, end, center in db.query("SELECT course_code, exam_date, start_time, end_time, center FROM exams"):
+        seated = db.query_one("SELECT count(*) FROM exams AS e JOIN registrations AS r ON r.course_code = e.course_code "
+                              "WHERE e.exam_date=? AND e.center=? AND e.start_time <= ? AND e.end_time > ?",
+                              (date, center, start, start))[0]
+        if seated > capacity.get(center, seated):
+            overloads.append((center, date, start, seated))
+    return clashes, overloads
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--courses", type=int, default=3000)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--centers", type=int, default=60)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "bench.db"), os.path.join(tmp, "uploads"))
+        exams = seed(args.students, args.courses, args.days, args.centers, random.Random(22))
+        print(f"{args.students} students, {args.students * 6} registrations, {len(exams)} exams "
+              f"over {args.days} days in {args.centers} centres")
+
+        ms, (clashes, overloads) = timed(timetable.validate)
+        print(f"sweep, whole timetable:   {ms:9.1f} ms  {len(clashes)} clashes, {len(overloads)} over-capacity")
+        ms, (day_clashes, _) = timed(lambda: timetable.validate(exams[0][1]))
+        print(f"sweep, one exam day:      {ms:9.1f} ms  {len(day_clashes)} clashes")
+        ms, (new_clashes, new_overloads) = timed(
+            lambda: timetable.check_exam(exams[1][0], exams[0][1], "10:00", "12:00", exams[0][4]))
+        print(f"vetting a posted exam:    {ms:9.1f} ms  {len(new_clashes)} clashes, {len(new_overloads)} over-capacity")
+        ms, _ = timed(lambda: timetable.student_timetable("s00042"))
+        print(f"one student's timetable:  {ms:9.1f} ms")
+
+        if not args.skip_baseline:
+            ms, (pairs, slow_overloads) = timed(baseline)
+            print(f"pairwise self-join:       {ms:9.1f} ms  {len(pairs)} clashes, {len(slow_overloads)} over-capacity exams")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/check_query_plans.py
+"""Fail if a filtered query in the app falls back to a full table scan.
+
+    python -m benchmarks.check_query_plans [files...]
+
+Every SQL string literal with a WHERE clause in the given files (default:
+every top-level module except migrations.py) is run through EXPLAIN QUERY
+PLAN against a freshly migrated database. Queries that can never use a b-tree index are
+listed in ALLOWED_SCANS with the reason.
+"""
+import ast
+import glob
+import os
+import re
+import sys
+import tempfile
+
+import db
+
+
+ALLOWED_SCANS = set()
+
+# One-off migration statements are allowed to scan.
+SKIP_FILES = {"migrations.py"}
+
+SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.I)
+
+
+def sql_literals(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if SQL_START.match(node.value) and re.search(r"\bWHERE\b", node.value, re.I):
+                yield node.lineno, node.value
+
+
+def scans(conn, sql):
+    params = (None,) * sql.count("?")
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    # The schema table is tiny and has no indexes of its own; a virtual table
+    # scan (json_each, FTS) reads the function's own argument, not a b-tree.
+    return [row[-1] for row in plan
+            if row[-1].startswith("SCAN ") and "USING" not in row[-1] and "sqlite_master" not in row[-1]
+            and "VIRTUAL TABLE" not in row[-1]]
+
+
+def main(files):
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "plans.db")
+        db.bootstrap(db_file, os.path.join(tmp, "uploads"))
+        conn = db.connect(db_file)
+        for path in files:
+            for lineno, sql in sql_literals(path):
+                bad = scans(conn, sql)
+                if bad and sql not in ALLOWED_SCANS:
+                    failures += 1
+                    print(f"{path}:{lineno}: {'; '.join(bad)}\n    {sql}")
+        conn.close()
+    print(f"{failures} quer{'y' if failures == 1 else 'ies'} fall back to a table scan")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or sorted(set(glob.glob("*.py")) - SKIP_FILES)))
@@ -0,0 +1,176 @@
+# benchmarks/load_api.py
+"""Requests per second through the JSON API, next to the same reads driven through Streamlit.
+
+    python -m benchmarks.load_api [--clients 32] [--seconds 10] [--url http://127.0.0.1:8000] [--streamlit]
+
+Without --url a seeded database is created in a temporary directory and
+``python -m api`` (uvicorn) is started against it. Each client thread logs in
+once and then loops over inbox, exam timetable, library search and
+send-message requests on a keep-alive connection. With --streamlit the same
+reads are also timed as button clicks on the Student dashboard through
+AppTest, run serially since a Streamlit session handles one rerun at a time.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import db
+from helpers import hash_password
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERS = 200
+PASSWORD = "load-test"
+CALLS = [
+    ("GET", "/messages", None),
+    ("GET", "/messages/unread", None),
+    ("GET", "/exams", None),
+    ("GET", "/library?q=python", None),
+    ("POST", "/messages", {"to": "load00000", "message": "ping"}),
+]
+
+
+def seed():
+    hashed = hash_password(PASSWORD)
+    db.executemany("INSERT INTO users (role, username, password) VALUES ('Student', ?, ?)",
+                   ((f"load{i:05d}", hashed) for i in range(USERS)))
+    db.executemany("INSERT INTO messages (sender, receiver, message, timestamp) VALUES (?, ?, ?, '2024-01-01 00:00:00')",
+                   ((f"load{i % USERS:05d}", f"load{(i * 7) % USERS:05d}", f"message {i}") for i in range(USERS * 50)))
+    db.executemany("INSERT INTO library (title, author, available) VALUES (?, ?, 1)",
+                   ((f"Python volume {i}", f"Author {i}") for i in range(500)))
+    db.executemany("INSERT INTO exams (course_code, exam_date, center) VALUES (?, '2024-06-01', 'Main Hall')",
+                   ((f"C{i:03d}",) for i in range(40)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"API server did not start on {host}:{port}")
+
+
+def request(conn, method, path, body=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path} -> {response.status} {data[:200]!r}")
+    return data
+
+
+def client(url, index, stop, latencies, errors):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    try:
+        token = json.loads(request(conn, "POST", "/login", {"username": f"load{index % USERS:05d}", "password": PASSWORD}))["token"]
+        i = index
+        while not stop.is_set():
+            method, path, body = CALLS[i % len(CALLS)]
+            start = time.perf_counter()
+            try:
+                request(conn, method, path, body, token)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors.append(1)
+                conn.close()
+            i += 1
+    finally:
+        conn.close()
+
+
+def load_api(url, clients, seconds):
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(url, i, stop, latencies, errors)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    def pct(p):
+        return latencies[int(p * (len(latencies) - 1))] * 1000 if latencies else 0.0
+    print(f"API:       {len(latencies) / seconds:9.1f} req/s   p50 {pct(0.5):7.2f} ms   "
+          f"p95 {pct(0.95):7.2f} ms   {len(errors)} errors   ({clients} clients, {seconds}s)")
+
+
+def load_streamlit(seconds):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.session_state["username"] = "load00000"
+    at.session_state["role"] = "Student"
+    at.run()
+    next(t for t in at.text_input if t.label.startswith("Search library")).input("python")
+    labels = ["View Exam Timetable", "Search Library"]
+    clicks, i = 0, 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        next(b for b in at.button if b.label == labels[i % len(labels)]).click().run()
+        clicks += 1
+        i += 1
+    elapsed = time.perf_counter() - start
+    print(f"Streamlit: {clicks / elapsed:9.1f} interactions/s (one session, AppTest)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting the server")
+    parser.add_argument("--url", help="load an already running API (seeded with load-test users)")
+    parser.add_argument("--streamlit", action="store_true", help="also drive the Streamlit app for comparison")
+    args = parser.parse_args()
+
+    if args.url:
+        load_api(args.url, args.clients, args.seconds)
+        return
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # api.py and app.py open their database relative to the working directory
+        server = None
+        try:
+            pool = db.init(db.DB_FILE, db.UPLOAD_DIR)
+            seed()
+            pool.close()
+            port = free_port()
+            env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+            server = subprocess.Popen([sys.executable, "-m", "api", "--port", str(port), "--workers", str(args.workers)],
+                                      cwd=tmp, env=env)
+            wait_for("127.0.0.1", port)
+            load_api(f"http://127.0.0.1:{port}", args.clients, args.seconds)
+            if args.streamlit:
+                sys.path.insert(0, ROOT)
+                load_streamlit(args.seconds)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
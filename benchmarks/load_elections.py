@@ -0,0 +1,89 @@
+# benchmarks/load_elections.py
+"""Concurrent voting load test for the trigger-maintained election tally.
+
+    python -m benchmarks.load_elections [--students 5000] [--threads 32] [--candidates 8]
+
+Every student tries to vote twice; only the first ballot may count. Checks
+that the tally matches a GROUP BY over the ballots and compares the cost of
+reading results both ways.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import db
+import elections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--candidates", type=int, default=8)
+    args = parser.parse_args()
+
+    candidates = [f"candidate{i}" for i in range(args.candidates)]
+    ballots = [(f"student{i}", random.choice(candidates)) for i in range(args.students)] * 2
+    random.shuffle(ballots)
+    accepted = []
+    errors = []
+    latencies = []
+    lock = threading.Lock()
+
+    def voter(chunk):
+        for student, candidate in chunk:
+            start = time.perf_counter()
+            try:
+                ok = elections.cast_vote(student, candidate, "Guild 2024", "President")
+            except Exception as e:
+                errors.append(e)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if ok:
+                    accepted.append(student)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "votes.db"), os.path.join(tmp, "uploads"), pool_size=args.threads)
+        elections.add_position("Guild 2024", "President")
+        chunks = [ballots[i::args.threads] for i in range(args.threads)]
+        threads = [threading.Thread(target=voter, args=(c,)) for c in chunks]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        tally = dict(elections.results("Guild 2024", "President"))
+        counted = dict(db.query("SELECT candidate, count(*) FROM elections WHERE election=? AND position=? GROUP BY candidate",
+                                ("Guild 2024", "President")))
+        runs = 200
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            elections.results("Guild 2024", "President")
+        tally_ms = (time.perf_counter() - t0) / runs * 1000
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            db.query("SELECT candidate, count(*) FROM elections GROUP BY candidate")
+        group_ms = (time.perf_counter() - t0) / runs * 1000
+        pool.close()
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{len(ballots)} ballots from {args.threads} threads in {elapsed:.2f}s ({len(ballots) / elapsed:.0f} votes/s)")
+    print(f"vote latency p50 {p(0.50):.2f} ms  p95 {p(0.95):.2f} ms  p99 {p(0.99):.2f} ms")
+    print(f"accepted {len(accepted)} (expected {args.students}), duplicate students: {len(accepted) - len(set(accepted))}")
+    print(f"results read: tally {tally_ms:.3f} ms vs GROUP BY {group_ms:.3f} ms")
+    ok = not errors and tally == counted and len(accepted) == args.students == len(set(accepted))
+    print("tally consistent" if ok else f"MISMATCH: errors={errors[:3]} tally={tally} counted={counted}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
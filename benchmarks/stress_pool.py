@@ -0,0 +1,77 @@
+# benchmarks/stress_pool.py
+"""Concurrent readers and writers against the pooled WAL database.
+
+    python -m benchmarks.stress_pool [--writers 16] [--readers 16] [--ops 200]
+
+Exits non-zero if any operation fails (e.g. "database is locked").
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import db
+import helpers
+import payments
+import writebehind
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="operations per thread")
+    parser.add_argument("--pool-size", type=int, default=db.POOL_SIZE)
+    args = parser.parse_args()
+    # Exercise the pool itself rather than the write-behind queue.
+    writebehind.ENABLED = False
+
+    errors = []
+    barrier = threading.Barrier(args.writers + args.readers)
+
+    def writer(n):
+        barrier.wait()
+        for i in range(args.ops):
+            try:
+                helpers.send_message(f"writer{n}", f"user{i % 10}", f"message {i}")
+                payments.record_pending(f"user{i % 10}", 100.0)
+            except sqlite3.Error as e:
+                errors.append(e)
+
+    def reader(n):
+        barrier.wait()
+        for i in range(args.ops):
+            try:
+                db.query("SELECT sender, message, timestamp FROM messages WHERE receiver=?", (f"user{i % 10}",))
+                db.query("SELECT amount, status, timestamp FROM payments WHERE student=?", (f"user{i % 10}",))
+            except sqlite3.Error as e:
+                errors.append(e)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.init(os.path.join(tmp, "stress.db"), os.path.join(tmp, "uploads"), args.pool_size)
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        messages = db.query_one("SELECT count(*) FROM messages")[0]
+        pool.close()
+
+    total = (args.writers + args.readers) * args.ops * 2
+    print(f"{total} statements in {elapsed:.2f}s ({total / elapsed:.0f}/s), "
+          f"{messages} messages written, {len(errors)} errors")
+    for e in errors[:5]:
+        print("  ", repr(e))
+    expected = args.writers * args.ops
+    if errors or messages != expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
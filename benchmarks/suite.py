@@ -0,0 +1,284 @@
+# benchmarks/suite.py
+"""Load-test the dashboards and micro-benchmark the helpers; save the results as JSON.
+
+    python -m benchmarks.suite [--size small|medium|large] [--users 16] [--iterations 3]
+                               [--out benchmarks/results/<commit>.json] [--compare OLD.json]
+
+A synthetic university (benchmarks.university) is seeded into a temporary
+directory. ``--users`` virtual users, each in its own process, then log in
+concurrently (mostly students, some lecturers and admins) and walk their
+role's flow in app.py through streamlit's AppTest, ``--iterations`` times.
+The helpers are timed directly. Every step reports throughput and p50/p95/p99 latency. With
+``--compare`` the p95 of each step is checked against an earlier results file
+and the run exits non-zero if any step regressed by more than --threshold.
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import db
+import helpers
+import payments
+import writebehind
+from benchmarks import university
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+# role -> steps after the initial page load: (widget, label[, value])
+FLOWS = {
+    "Student": [
+        ("button", "View Payments"),
+        ("text_input", "Search library (title or author)", "introduction"),
+        ("button", "Search Library"),
+        ("button", "View Exam Timetable"),
+        ("button", "View Hostel Application Status"),
+        ("toggle", "View Forum Posts"),
+    ],
+    "Lecturer": [
+        ("button", "View All Courses"),
+        ("text_input", "Course code for roster", "C0001"),
+        ("toggle", "View Inbox"),
+    ],
+    "Admin": [
+        ("toggle", "View All Users"),
+        ("button", "View Hostels"),
+        ("button", "View Votes"),
+        ("toggle", "View All Payments"),
+    ],
+}
+# Roughly the portal's real mix: mostly students.
+ROLE_MIX = ["Student"] * 8 + ["Lecturer", "Admin"]
+
+
+def summarize(latencies, wall):
+    latencies = sorted(latencies)
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+    if not latencies:
+        return {"count": 0}
+    return {"count": len(latencies), "throughput_per_s": round(len(latencies) / wall, 2) if wall else None,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(latencies[-1] * 1000, 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ---------------------- Dashboards ----------------------
+def find(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+def virtual_user(n, iterations, students, workdir):
+    """One user's flows, run in its own process. Returns ``({step: [seconds]}, [errors])``."""
+    # AppTest keeps per-process global state, so concurrent users need processes, not threads.
+    os.chdir(workdir)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    from streamlit.testing.v1 import AppTest
+
+    latencies, errors = defaultdict(list), []
+    role = ROLE_MIX[n % len(ROLE_MIX)]
+    username = {"Student": university.student(n % students),
+                "Lecturer": university.lecturer(0), "Admin": university.admin(0)}[role]
+    for _ in range(iterations):
+        at = AppTest.from_file(APP, default_timeout=300)
+        at.session_state["username"] = username
+        at.session_state["role"] = role
+        steps = [("load", None)] + FLOWS[role]
+        for step in steps:
+            widget, label = step[0], step[1]
+            name = f"{role} / {label or 'page load'}"
+            start = time.perf_counter()
+            try:
+                if widget == "load":
+                    at.run()
+                elif widget == "button":
+                    find(at.button, label).click().run()
+                elif widget == "toggle":
+                    find(at.toggle, label).set_value(True).run()
+                else:
+                    find(at.text_input, label).input(step[2]).run()
+            except Exception as e:
+                errors.append(f"{name}: {e!r}")
+                break
+            elapsed = time.perf_counter() - start
+            if at.exception:
+                errors.append(f"{name}: {at.exception[0].message}")
+                break
+            latencies[name].append(elapsed)
+    return dict(latencies), errors
+
+
+def run_dashboards(users, iterations, students):
+    latencies = defaultdict(list)
+    errors = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=users, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(virtual_user, n, iterations, students, os.getcwd()) for n in range(users)]
+        for future in futures:
+            user_latencies, user_errors = future.result()
+            for name, values in user_latencies.items():
+                latencies[name].extend(values)
+            errors.extend(user_errors)
+    wall = time.perf_counter() - start
+    steps = {name: summarize(values, wall) for name, values in sorted(latencies.items())}
+    steps["all interactions"] = summarize([s for values in latencies.values() for s in values], wall)
+    return steps, errors
+
+# ---------------------- Helpers ----------------------
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def time_calls(fn, n, finish=None):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t)
+    if finish:
+        finish()
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_helpers(n, students):
+    rng = random.Random(7)
+    results = {}
+    # Write-behind returns once queued; throughput includes the final flush.
+    results["send_message"] = time_calls(
+        lambda i: helpers.send_message(university.student(i % students), university.student((i * 7) % students), f"bench {i}"),
+        n, writebehind.get_queue().flush if writebehind.ENABLED else None)
+    results["mpesa_payment"] = time_calls(
+        lambda i: helpers.mpesa_payment(university.student(i % students), 100.0), n)
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        results["generate_pdf_bytes"] = {"skipped": "reportlab is not installed"}
+    else:
+        lines = [f"Line {k}: {'x' * 60}" for k in range(40)]
+        results["generate_pdf_bytes"] = time_calls(lambda i: helpers.generate_pdf_bytes(lines + [str(i)]), max(1, n // 10))
+    payload = rng.randbytes(256 * 1024)
+    results["save_uploaded_file (256 KiB)"] = time_calls(
+        lambda i: helpers.save_uploaded_file(Upload(i.to_bytes(4, "big") + payload, f"bench_{i}.pdf"),
+                                             university.student(i % students)),
+        max(1, n // 10))
+    return results
+
+# ---------------------- Comparison ----------------------
+def compare(old, new, threshold, min_delta_ms):
+    """Print p95 changes for steps present in both runs; return the regressed step names."""
+    regressed = []
+    print(f"\n{'step':<52} {'old p95':>10} {'new p95':>10} {'change':>8}")
+    for group in ("dashboards", "helpers"):
+        for name, now in new.get(group, {}).items():
+            before = old.get(group, {}).get(name, {})
+            if "p95_ms" not in now or "p95_ms" not in before or not before["p95_ms"]:
+                continue
+            change = now["p95_ms"] / before["p95_ms"] - 1
+            # Sub-millisecond steps are mostly timer noise; require an absolute slowdown too.
+            slower_ms = now["p95_ms"] - before["p95_ms"]
+            flag = "  REGRESSION" if change > threshold and slower_ms > min_delta_ms else ""
+            if flag:
+                regressed.append(name)
+            print(f"{name:<52} {before['p95_ms']:10.2f} {now['p95_ms']:10.2f} {change:+8.1%}{flag}")
+    return regressed
+
+
+def print_table(title, steps):
+    print(f"\n{title}")
+    print(f"{'step':<52} {'n':>6} {'per s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in steps.items():
+        if "skipped" in s:
+            print(f"{name:<52} skipped: {s['skipped']}")
+        elif s["count"]:
+            print(f"{name:<52} {s['count']:6d} {s['throughput_per_s'] or 0:9.1f} "
+                  f"{s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(university.SIZES), default="small")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="flows per virtual user")
+    parser.add_argument("--helper-calls", type=int, default=500)
+    parser.add_argument("--skip-app", action="store_true", help="only micro-benchmark the helpers")
+    parser.add_argument("--out", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare p95 latencies against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 growth counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes smaller than this")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"size": args.size, "users": args.users, "iterations": args.iterations,
+                   "helper_calls": args.helper_calls, **university.SIZES[args.size]},
+    }
+    errors = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # app.py opens its database relative to the working directory
+        try:
+            db.init(db.DB_FILE, db.UPLOAD_DIR)  # app.py's own db.init replaces this pool
+            start = time.perf_counter()
+            results["seeded"] = university.seed(**university.SIZES[args.size])
+            results["seed_seconds"] = round(time.perf_counter() - start, 2)
+            print(f"seeded {results['seeded']} in {results['seed_seconds']}s")
+
+            results["helpers"] = run_helpers(args.helper_calls, university.SIZES[args.size]["students"])
+            print_table("helpers", results["helpers"])
+
+            if not args.skip_app:
+                sys.path.insert(0, ROOT)
+                results["dashboards"], errors = run_dashboards(args.users, args.iterations,
+                                                               university.SIZES[args.size]["students"])
+                results["errors"] = errors
+                print_table(f"dashboards ({args.users} concurrent users)", results["dashboards"])
+        finally:
+            payments.get_processor().shutdown()
+            os.chdir(cwd)
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {out}")
+
+    for e in errors:
+        print("error:", e)
+    regressed = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(json.load(f), results, args.threshold, args.min_delta_ms)
+    if errors or regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/university.py
+"""Seed a synthetic university into the current database pool.
+
+    from benchmarks import university
+    counts = university.seed(students=5000)
+
+Every account's password is ``university.PASSWORD``. Student, lecturer and
+admin usernames are ``student00000``, ``lecturer000`` and ``admin00``.
+"""
+import io
+import random
+
+import db
+import storage
+from helpers import hash_password
+
+PASSWORD = "bench"
+SIZES = {
+    "small": dict(students=500, lecturers=20, courses=40),
+    "medium": dict(students=5000, lecturers=100, courses=200),
+    "large": dict(students=20000, lecturers=400, courses=800),
+}
+TIMESTAMP = "2024-01-01 08:00:00"
+
+
+def student(i):
+    return f"student{i:05d}"
+
+
+def lecturer(i):
+    return f"lecturer{i:03d}"
+
+
+def admin(i):
+    return f"admin{i:02d}"
+
+
+def seed(students=500, lecturers=20, courses=40, admins=2, courses_per_student=5,
+         messages_per_student=10, posts_per_student=2, payments_per_student=3,
+         uploads_per_student=1, upload_bytes=16 * 1024, upload_dir=db.UPLOAD_DIR, seed=42):
+    """Insert the synthetic university and return a dict of row counts."""
+    rng = random.Random(seed)
+    hashed = hash_password(PASSWORD)
+    codes = [f"C{i:04d}" for i in range(courses)]
+    students_ = [student(i) for i in range(students)]
+    lecturers_ = [lecturer(i) for i in range(lecturers)]
+    users = ([("Student", s, f"ADM/{i:05d}") for i, s in enumerate(students_)]
+             + [("Lecturer", u, None) for u in lecturers_]
+             + [("Admin", admin(i), None) for i in range(admins)])
+    db.executemany("INSERT INTO users (role, full_name, student_id, username, email, phone, password) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   ((role, username.title(), sid, username, f"{username}@uni.example", "0700000000", hashed)
+                    for role, username, sid in users))
+    db.executemany("INSERT OR IGNORE INTO courses (course_code, course_name) VALUES (?, ?)",
+                   ((c, f"Course {c}") for c in codes))
+    registrations = [(s, c) for s in students_ for c in rng.sample(codes, min(courses_per_student, courses))]
+    db.executemany("INSERT OR IGNORE INTO registrations (student, course_code) VALUES (?, ?)", registrations)
+    db.executemany("INSERT INTO exams (course_code, exam_date, center) VALUES (?, ?, ?)",
+                   ((c, f"2024-06-{1 + i % 28:02d}", f"Hall {i % 10}") for i, c in enumerate(codes)))
+    everyone = students_ + lecturers_
+    db.executemany("INSERT INTO messages (sender, receiver, message, timestamp) VALUES (?, ?, ?, ?)",
+                   ((rng.choice(everyone), s, f"Reminder {n} about {rng.choice(codes)}", TIMESTAMP)
+                    for s in students_ for n in range(messages_per_student)))
+    db.executemany("INSERT INTO forum (user, message, timestamp) VALUES (?, ?, ?)",
+                   ((s, f"Question {n} on {rng.choice(codes)} revision and exams", TIMESTAMP)
+                    for s in students_ for n in range(posts_per_student)))
+    db.executemany("INSERT INTO payments (student, amount, status, timestamp) VALUES (?, ?, ?, ?)",
+                   ((s, float(rng.randrange(500, 50000, 500)), rng.choice(["SUCCESS", "SUCCESS", "FAILED"]), TIMESTAMP)
+                    for s in students_ for _ in range(payments_per_student)))
+    db.executemany("INSERT INTO hostel (student, room_number, status, timestamp) VALUES (?, ?, 'Pending', ?)",
+                   ((s, str(rng.randrange(1, 500)), TIMESTAMP) for s in students_[::4]))
+    db.executemany("INSERT INTO library (title, author, available) VALUES (?, ?, ?)",
+                   ((f"Introduction to {c} volume {n}", f"Author {rng.randrange(200)}", rng.randrange(0, 5))
+                    for c in codes for n in range(3)))
+
+    uploads = []
+    for s in students_:
+        for n in range(uploads_per_student):
+            digest, size = storage.store(io.BytesIO(rng.randbytes(upload_bytes)), upload_dir)
+            uploads.append((s, rng.choice(codes), f"{s}_essay_{n}.pdf", TIMESTAMP, digest, size))
+    db.executemany("INSERT INTO assignments (student, course_code, filename, timestamp, sha256, size) "
+                   "VALUES (?, ?, ?, ?, ?, ?)", uploads)
+
+    return {"users": len(users), "courses": courses, "registrations": len(registrations),
+            "messages": students * messages_per_student, "forum": students * posts_per_student,
+            "payments": students * payments_per_student, "uploads": len(uploads)}
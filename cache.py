@@ -0,0 +1,83 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import db
+
+class ReferenceCache:
+    """Read-through LRU cache for rarely-changing tables.
+
+    Each table has a version counter. Entries remember the version they were
+    read at and are only served while it is still current; writes made
+    through ``execute`` bump the counter and drop that table's entries.
+    Writes from other processes (e.g. manage.py imports) cannot bump the
+    counters, so entries also expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (table, sql, params) -> (version, expires, rows)
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, table):
+        with self._lock:
+            return self._versions[table]
+
+    def bump(self, table):
+        with self._lock:
+            self._versions[table] += 1
+            for key in [k for k in self._entries if k[0] == table]:
+                del self._entries[key]
+
+    def query(self, table, sql, params=()):
+        key = (table, sql, tuple(params))
+        with self._lock:
+            # Read the version before querying so a write that lands while we
+            # are reading leaves this entry stale rather than wrongly current.
+            version = self._versions[table]
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        rows = tuple(db.query(sql, params))
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return rows
+
+    def execute(self, table, sql, params=()):
+        try:
+            return db.execute(sql, params)
+        finally:
+            self.bump(table)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "versions": dict(self._versions),
+            }
+
+# Shared by every session in the Streamlit process.
+reference = ReferenceCache()
@@ -0,0 +1,307 @@
+# db.py
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+import migrations
+
+DB_FILE = "myunispace.db"
+UPLOAD_DIR = "uploads"
+
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+
+# Applied to every pooled connection. WAL lets readers run alongside the single
+# writer; NORMAL sync is durable across app crashes in WAL mode.
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+]
+
+# Seed simple library & job board (only once)
+def seed_sample_data(conn):
+    if conn.execute("SELECT count(*) FROM library").fetchone()[0] == 0:
+        sample_books = [
+            ("Discrete Math", "Rosen", 3),
+            ("Algorithm Design", "Kleinberg", 2),
+            ("Database Systems", "Elmasri", 1),
+            ("Operating Systems", "Tanenbaum", 2)
+        ]
+        conn.executemany("INSERT INTO library (title, author, available) VALUES (?, ?, ?)", sample_books)
+    if conn.execute("SELECT count(*) FROM jobs").fetchone()[0] == 0:
+        sample_jobs = [
+            ("Backend Intern", "Acme Ltd", "Work on APIs", "jobs@acme.example"),
+            ("Data Analyst", "DataCorp", "Analyze student data", "hr@datacorp.example")
+        ]
+        conn.executemany("INSERT INTO jobs (title, company, description, contact) VALUES (?, ?, ?, ?)", sample_jobs)
+
+def bootstrap(db_file=DB_FILE, upload_dir=UPLOAD_DIR):
+    """Bring the database up to the latest migration.
+
+    Migrations and seeding only run when the stored version is behind, so an
+    already-initialised database costs a single PRAGMA read.
+    """
+    conn = connect(db_file)
+    try:
+        if migrations.schema_version(conn) < migrations.LATEST_VERSION:
+            if migrations.migrate(conn):
+                conn.execute("BEGIN IMMEDIATE")
+                seed_sample_data(conn)
+                conn.execute("COMMIT")
+    finally:
+        conn.close()
+    os.makedirs(upload_dir, exist_ok=True)
+
+# ---------------------- Instrumentation ----------------------
+class InstrumentedCursor(sqlite3.Cursor):
+    """Reports each statement to metrics, timed from execute until its rows are fetched."""
+
+    _pending = None  # [sql, seconds, rows] while a SELECT still has rows to fetch
+
+    def _add(self, seconds, rows):
+        if self._pending is not None:
+            self._pending[1] += seconds
+            self._pending[2] += rows
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            metrics.observe_query(*pending)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+        if self.description is None:
+            metrics.observe_query(sql, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, elapsed, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        metrics.observe_query(sql, time.perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - start, row is not None)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(time.perf_counter() - start, len(rows))
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        self._add(time.perf_counter() - start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class InstrumentedConnection(sqlite3.Connection):
+    # sqlite3.Connection.execute bypasses Python-level cursor overrides, so
+    # route the shortcuts through cursor() explicitly.
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# ---------------------- Connection pool ----------------------
+def connect(db_file=DB_FILE):
+    # Autocommit mode: transactions are opened explicitly by ConnectionPool.
+    factory = InstrumentedConnection if metrics.ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000, factory=factory,
+                           check_same_thread=False, isolation_level=None)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class ConnectionPool:
+    """A bounded set of SQLite connections handed out one transaction at a time."""
+
+    def __init__(self, db_file=DB_FILE, size=POOL_SIZE, timeout=30.0):
+        self.db_file = db_file
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no database connection free after {self.timeout}s")
+
+    def _open(self):
+        return connect(self.db_file)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, write=False):
+        """Borrow a connection for one transaction, committing on success.
+
+        Write transactions start with BEGIN IMMEDIATE so they queue on the
+        write lock up front instead of failing when upgrading from a read.
+        """
+        conn = self.acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+
+_pool = None
+_pool_lock = threading.Lock()
+# While set, read-only transactions borrow from this pool instead (see reporting.py).
+_read_pool = contextvars.ContextVar("read_pool", default=None)
+
+def init(db_file=DB_FILE, upload_dir=UPLOAD_DIR, pool_size=POOL_SIZE):
+    """Bootstrap the database and install the process-wide connection pool."""
+    global _pool
+    bootstrap(db_file, upload_dir)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(db_file, pool_size)
+    return _pool
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                bootstrap()
+                _pool = ConnectionPool()
+    return _pool
+
+@contextmanager
+def reads_from(pool):
+    """Serve read-only transactions in this block from ``pool``; writes still use the main pool."""
+    token = _read_pool.set(pool)
+    try:
+        yield pool
+    finally:
+        _read_pool.reset(token)
+
+def transaction(write=False):
+    pool = None if write else _read_pool.get()
+    return (pool or get_pool()).connection(write)
+
+def query(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def query_one(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params).fetchone()
+
+def execute(sql, params=()):
+    with transaction(write=True) as conn:
+        return conn.execute(sql, params)
+
+def executemany(sql, seq_of_params):
+    with transaction(write=True) as conn:
+        return conn.executemany(sql, seq_of_params)
+
+# ---------------------- Pagination ----------------------
+PAGE_SIZE = 50
+
+def fetch_page(table, columns, where="", params=(), cursor=None, page_size=PAGE_SIZE, descending=True):
+    """Fetch one page of ``table`` ordered by id using keyset (id-cursor) paging.
+
+    ``cursor`` is the id returned as ``next_cursor`` by the previous page, or
+    None for the first page. Returns ``(rows, next_cursor)`` where
+    ``next_cursor`` is None on the last page. Only ``page_size + 1`` rows are
+    read no matter how deep the page is.
+    """
+    conditions = [f"({where})"] if where else []
+    params = list(params)
+    if cursor is not None:
+        conditions.append("id < ?" if descending else "id > ?")
+        params.append(cursor)
+    sql = f"SELECT id, {columns} FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?"
+    params.append(page_size + 1)
+    rows = query(sql, params)
+    next_cursor = rows[page_size - 1][0] if len(rows) > page_size else None
+    return [r[1:] for r in rows[:page_size]], next_cursor
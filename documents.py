@@ -0,0 +1,302 @@
+# documents.py
+"""Exam cards, transcripts and fee statements, singly or for a whole cohort.
+
+Single documents go through ``render``, which memoises PDF bytes per
+(database, document type, student, data version); the version comes from the
+trigger-maintained ``data_versions`` table, so a cached PDF is reused until
+the exams, the student's registrations or their payments change.
+
+Batch mode reads everything it needs in a handful of set-based queries,
+renders PDFs in a process pool and streams them into a ZIP file, so memory
+stays bounded by the number of documents in flight rather than the cohort.
+
+    python -m documents exam_card --out exam_cards.zip [--workers N]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import threading
+import random
+import sys
+import time
+import weakref
+import zipfile
+from collections import OrderedDict, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import db
+import timetable
+from helpers import generate_pdf_bytes, render_pdf_bytes
+
+DOC_TYPES = {
+    "exam_card": "Exam Card",
+    "transcript": "Transcript",
+    "fee_statement": "Fee Statement",
+}
+EXPORT_DIR = "exports"
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# A directory to keep rendered PDFs in across restarts.
+PDF_CACHE_DIR = os.environ.get("MYUNISPACE_PDF_CACHE_DIR") or None
+
+# Which data_versions sources each cacheable document depends on.
+VERSION_SOURCES = {
+    "exam_card": (("exams", None), ("registrations", "student")),
+    "fee_statement": (("payments", "student"),),
+}
+
+# ---------------------- Document contents ----------------------
+def exam_card_lines(student, exams, as_of):
+    lines = [f"Exam Card for {student}", f"Data as of: {as_of}"]
+    if not exams:
+        lines.append("No exams scheduled for your registered courses.")
+    for course, date, start, end, center in exams:
+        lines.append(f"{course} - {date} {start}-{end} - {center}")
+    return lines
+
+def transcript_lines(student, course_codes, as_of):
+    lines = [f"Transcript for {student}", f"Generated: {as_of}"]
+    for code in course_codes:
+        lines.append(f"{code} : {random.choice(['A','B','C','D','E'])}")
+    return lines
+
+def fee_statement_lines(student, payments, as_of):
+    lines = [f"Fee Statement for {student}", f"Data as of: {as_of}"]
+    for p in payments:
+        lines.append(f"{p[2]} | KES {p[0]} | {p[1]}")
+    return lines
+
+# ---------------------- Data versions ----------------------
+def data_version(source, key=""):
+    """Return ``(version, updated_at)`` for a data_versions entry, (0, None) if untouched."""
+    row = db.query_one("SELECT version, updated_at FROM data_versions WHERE source=? AND key=?", (source, key))
+    return (row[0], row[1]) if row else (0, None)
+
+def version_label(version, updated_at):
+    if isinstance(version, tuple):
+        version = ".".join(map(str, version))
+    return f"{updated_at} (v{version})" if updated_at else "no records (v0)"
+
+def document_version(doc_type, student):
+    """Return ``(versions, updated_at)``: one version per source, and the latest change among them."""
+    entries = [data_version(source, student if keyed_by == "student" else "")
+               for source, keyed_by in VERSION_SOURCES[doc_type]]
+    return tuple(v for v, _ in entries), max((u for _, u in entries if u), default=None)
+
+_database_ids = weakref.WeakKeyDictionary()
+
+def database_identity():
+    """``(path, first migration time)`` of the live database.
+
+    Versions start again at 1 in a recreated database, so cache keys carry
+    this to keep a reset database from being served the old one's PDFs.
+    """
+    pool = db.get_pool()
+    identity = _database_ids.get(pool)
+    if identity is None:
+        row = db.query_one("SELECT applied_at FROM schema_migrations WHERE version=1")
+        identity = _database_ids[pool] = (os.path.abspath(pool.db_file), row[0] if row else None)
+    return identity
+
+def document_lines(doc_type, student, as_of):
+    if doc_type == "exam_card":
+        return exam_card_lines(student, timetable.student_timetable(student), as_of)
+    if doc_type == "fee_statement":
+        pays = db.query("SELECT amount, status, timestamp FROM payments WHERE student=?", (student,))
+        return fee_statement_lines(student, pays, as_of)
+    raise ValueError(f"{doc_type} documents are not cacheable")
+
+# ---------------------- Render cache ----------------------
+class PdfCache:
+    """Size-bounded LRU of rendered PDF bytes, optionally mirrored to disk."""
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.pdf")
+
+    def get(self, key):
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), "rb") as f:
+                pdf = f.read()
+            self._remember(key, pdf)
+            with self._lock:
+                self.hits += 1
+            return pdf
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, pdf):
+        self._remember(key, pdf)
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def _remember(self, key, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = pdf
+            self._bytes += len(pdf)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+pdf_cache = PdfCache(disk_dir=PDF_CACHE_DIR)
+
+def render(doc_type, student, cache=None):
+    """Return PDF bytes for one student's exam card or fee statement.
+
+    Served from ``cache`` (default: the process-wide pdf_cache) while the
+    underlying rows are unchanged, without calling reportlab again.
+    """
+    cache = cache or pdf_cache
+    # Version first, rows second: a write in between only makes the next
+    # lookup miss, it can never pin stale rows to a newer version.
+    version, updated_at = document_version(doc_type, student)
+    key = (database_identity(), doc_type, student, version)
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = generate_pdf_bytes(document_lines(doc_type, student, version_label(version, updated_at)))
+        cache.put(key, pdf)
+    return pdf
+
+# ---------------------- Batch ----------------------
+def cohort_documents(doc_type):
+    """Yield ``(file_name, lines)`` for every student, from set-based queries."""
+    generated = datetime.now()
+    students = [r[0] for r in db.query("SELECT username FROM users WHERE role='Student' ORDER BY username")]
+    if doc_type == "exam_card":
+        exams = defaultdict(list)
+        for student, *exam in db.query(
+                "SELECT r.student, e.course_code, e.exam_date, e.start_time, e.end_time, e.center "
+                "FROM registrations AS r JOIN exams AS e ON e.course_code = r.course_code "
+                "ORDER BY r.student, e.exam_date, e.start_time, e.course_code"):
+            exams[student].append(exam)
+        exams_version, exams_updated = data_version("exams")
+        versions = {key: (version, updated_at) for key, version, updated_at in
+                    db.query("SELECT key, version, updated_at FROM data_versions WHERE source='registrations'")}
+        for s in students:
+            reg_version, reg_updated = versions.get(s, (0, None))
+            as_of = version_label((exams_version, reg_version), max(filter(None, (exams_updated, reg_updated)), default=None))
+            yield f"exam_card_{s}.pdf", exam_card_lines(s, exams[s], as_of)
+    elif doc_type == "transcript":
+        regs = defaultdict(list)
+        for student, code in db.query("SELECT student, course_code FROM registrations ORDER BY student, course_code"):
+            regs[student].append(code)
+        for s in students:
+            yield f"transcript_{s}.pdf", transcript_lines(s, regs[s], generated)
+    elif doc_type == "fee_statement":
+        pays = defaultdict(list)
+        for student, amount, status, ts in db.query("SELECT student, amount, status, timestamp FROM payments ORDER BY student, id"):
+            pays[student].append((amount, status, ts))
+        versions = {key: (version, updated_at) for key, version, updated_at in
+                    db.query("SELECT key, version, updated_at FROM data_versions WHERE source='payments'")}
+        for s in students:
+            as_of = version_label(*versions.get(s, (0, None)))
+            yield f"fee_statement_{s}.pdf", fee_statement_lines(s, pays[s], as_of)
+    else:
+        raise ValueError(f"unknown document type: {doc_type}")
+
+def _render(item):
+    file_name, lines = item
+    return file_name, render_pdf_bytes(lines)
+
+def render_zip(items, out_path, workers=None, progress=None, total=None):
+    """Render ``(file_name, lines)`` items in a process pool into a ZIP at ``out_path``.
+
+    At most ``workers * 4`` documents are queued or held at once. ``progress``
+    is called as ``progress(done, total, docs_per_second)`` after each file is
+    written. Returns ``(count, elapsed_seconds)``.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    start = time.perf_counter()
+    done = 0
+    items = iter(items)
+    # spawn, not fork: the caller is often the multithreaded Streamlit server.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool, \
+            zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < window:
+                try:
+                    pending.add(pool.submit(_render, next(items)))
+                except StopIteration:
+                    exhausted = True
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                file_name, pdf = future.result()
+                zf.writestr(file_name, pdf)
+                done += 1
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    progress(done, total, done / elapsed if elapsed else 0.0)
+    return done, time.perf_counter() - start
+
+def generate_cohort_zip(doc_type, out_path=None, workers=None, progress=None):
+    """Write the cohort ZIP; by default to ``exports/<type>s.zip``, replacing the previous export."""
+    if out_path is None:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        out_path = os.path.join(EXPORT_DIR, f"{doc_type}s.zip")
+    total = db.query_one("SELECT count(*) FROM users WHERE role='Student'")[0]
+    # Rendered beside the target and renamed into place, so a download of the
+    # previous export is never served a half-written file.
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        count, elapsed = render_zip(cohort_documents(doc_type), tmp_path, workers, progress, total)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return out_path, count, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m documents", description="Generate documents for every student")
+    parser.add_argument("doc_type", choices=sorted(DOC_TYPES))
+    parser.add_argument("--out", help="ZIP file to write (default: exports/<type>s.zip)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--db", default=db.DB_FILE)
+    args = parser.parse_args(argv)
+
+    db.init(args.db)
+
+    def progress(done, total, rate):
+        sys.stderr.write(f"\r{done}/{total} documents, {rate:.1f} docs/s")
+
+    out_path, count, elapsed = generate_cohort_zip(args.doc_type, args.out, args.workers, progress)
+    sys.stderr.write("\n")
+    print(f"Wrote {count} documents to {out_path} in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f} docs/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# elections.py
+"""Student elections with a trigger-maintained tally.
+
+Ballots go into ``elections`` with a UNIQUE (election, position, student)
+key, and triggers keep ``election_tally`` in step in the same transaction,
+so results are a primary-key range read over the candidates rather than a
+GROUP BY over every ballot.
+"""
+from datetime import datetime
+
+import db
+
+def positions():
+    """``(election, position)`` pairs students can vote in."""
+    return db.query("SELECT election, position FROM election_positions ORDER BY election, position")
+
+def add_position(election, position):
+    db.execute("INSERT OR IGNORE INTO election_positions (election, position) VALUES (?, ?)", (election, position))
+
+def cast_vote(student, candidate, election="General", position="General"):
+    """Record a ballot. Returns False if the student already voted for this position."""
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = db.execute("INSERT OR IGNORE INTO elections (student, candidate, timestamp, election, position) "
+                     "VALUES (?, ?, ?, ?, ?)", (student, candidate, ts, election, position))
+    return cur.rowcount == 1
+
+def results(election="General", position="General"):
+    """``(candidate, votes)`` for one position, most votes first."""
+    return db.query("SELECT candidate, votes FROM election_tally WHERE election=? AND position=? AND votes > 0 "
+                    "ORDER BY votes DESC, candidate", (election, position))
@@ -0,0 +1,128 @@
+# gateway_stub.py
+"""Local stand-in for the M-Pesa STK push API.
+
+Payments stay PENDING for a configurable latency and then resolve to SUCCESS
+or FAILED at a configurable failure rate, so the payment pipeline can be
+exercised and benchmarked without the real service.
+
+    python gateway_stub.py [--port 8099] [--latency 2.0] [--jitter 0.5] [--failure-rate 0.2]
+
+    POST /stkpush      {"account", "amount", "idempotency_key", "callback_url"?} -> {"checkout_id"}
+    GET  /status/<id>  -> {"checkout_id", "status"}
+
+When a callback_url is given, the final status is also POSTed there as
+{"checkout_id", "status"}.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class SimulatedGateway:
+    """In-process gateway with the same push/status interface as payments.HttpGateway."""
+
+    def __init__(self, latency=2.0, jitter=0.5, failure_rate=0.5, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._checkouts = {}  # checkout_id -> (due, outcome)
+        self._by_key = {}     # idempotency_key -> checkout_id
+        self._lock = threading.Lock()
+
+    def push(self, account, amount, idempotency_key, callback_url=None):
+        with self._lock:
+            if idempotency_key in self._by_key:
+                return self._by_key[idempotency_key]
+            checkout_id = uuid.uuid4().hex
+            delay = max(0.0, self._rng.uniform(self.latency * (1 - self.jitter), self.latency * (1 + self.jitter)))
+            outcome = "FAILED" if self._rng.random() < self.failure_rate else "SUCCESS"
+            self._checkouts[checkout_id] = (time.monotonic() + delay, outcome)
+            self._by_key[idempotency_key] = checkout_id
+        if callback_url:
+            timer = threading.Timer(delay, post_callback, (callback_url, checkout_id, outcome))
+            timer.daemon = True
+            timer.start()
+        return checkout_id
+
+    def status(self, checkout_id):
+        with self._lock:
+            entry = self._checkouts.get(checkout_id)
+        if entry is None:
+            return "UNKNOWN"
+        due, outcome = entry
+        return outcome if time.monotonic() >= due else "PENDING"
+
+def post_callback(url, checkout_id, status):
+    body = json.dumps({"checkout_id": checkout_id, "status": status}).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        urllib.request.urlopen(req, timeout=10).close()
+    except OSError:
+        pass  # the pipeline falls back to polling
+
+def make_server(host="127.0.0.1", port=8099, gateway=None, error_rate=0.0):
+    """HTTP server around ``gateway``; ``error_rate`` of requests get a 503."""
+    gateway = gateway or SimulatedGateway()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _unavailable(self):
+            if error_rate and random.random() < error_rate:
+                self._reply(503, {"error": "service unavailable"})
+                return True
+            return False
+
+        def do_POST(self):
+            if self.path != "/stkpush":
+                return self._reply(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+            if self._unavailable():
+                return
+            checkout_id = gateway.push(req.get("account"), req.get("amount"),
+                                       req.get("idempotency_key") or uuid.uuid4().hex, req.get("callback_url"))
+            self._reply(200, {"checkout_id": checkout_id})
+
+        def do_GET(self):
+            if not self.path.startswith("/status/"):
+                return self._reply(404, {"error": "not found"})
+            if self._unavailable():
+                return
+            checkout_id = self.path[len("/status/"):]
+            self._reply(200, {"checkout_id": checkout_id, "status": gateway.status(checkout_id)})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local M-Pesa STK push stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=2.0, help="mean seconds until a payment resolves")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency spread as a fraction of the mean")
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+    gateway = SimulatedGateway(args.latency, args.jitter, args.failure_rate)
+    server = make_server(args.host, args.port, gateway, args.error_rate)
+    print(f"M-Pesa stub listening on http://{args.host}:{server.server_port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# helpers.py
+import hashlib
+from datetime import datetime
+import io
+
+import db
+import images
+import metrics
+import payments
+import storage
+import writebehind
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def verify_password(password: str, hashed: str) -> bool:
+    return hash_password(password) == hashed
+
+def send_message(sender: str, receiver: str, message: str):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    writebehind.submit("INSERT INTO messages (sender, receiver, message, timestamp) VALUES (?, ?, ?, ?)",
+                       (sender, receiver, message, timestamp))
+
+@metrics.timed("pdf")
+def generate_pdf_bytes(text_lines):
+    """Return PDF bytes for download (in-memory)."""
+    return render_pdf_bytes(text_lines)
+
+def render_pdf_bytes(text_lines):
+    """Uninstrumented generate_pdf_bytes, for worker processes whose metrics would be lost."""
+    # reportlab is slow to import; only pay for it once a PDF is requested.
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    # invariant: no wall-clock creation date or random ID, so equal input gives equal bytes.
+    pdf = canvas.Canvas(buf, invariant=True)
+    y = 800
+    for line in text_lines:
+        pdf.drawString(50, y, line)
+        y -= 18
+        if y < 50:
+            pdf.showPage()
+            y = 800
+    pdf.save()
+    buf.seek(0)
+    return buf.read()
+
+def generate_pdf_file(path, text_lines):
+    b = generate_pdf_bytes(text_lines)
+    with open(path, "wb") as f:
+        f.write(b)
+    return path
+
+def mpesa_payment(student: str, amount: float, idempotency_key=None):
+    """Start an M-Pesa payment; it is resolved in the background by payments.py."""
+    payment_id, status = payments.submit(student, amount, idempotency_key)
+    return status
+
+def save_uploaded_file(uploaded_file, student, course_code="General"):
+    filename = uploaded_file.name
+    # Over-quota bytes are left unreferenced in the store for gc to remove.
+    digest, size = storage.store(uploaded_file)
+    storage.check_quota(student, size)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    db.execute("INSERT INTO assignments (student, course_code, filename, timestamp, sha256, size) VALUES (?, ?, ?, ?, ?, ?)",
+               (student, course_code, filename, timestamp, digest, size))
+    return storage.blob_path(digest)
+
+def save_camera_image(camera_image, username, course_code="General"):
+    """Store a capture as submitted and queue it for transcoding; returns without waiting for it."""
+    filename = f"{username}_camera_{int(datetime.now().timestamp())}.png"
+    digest, size = storage.store(camera_image)
+    storage.check_quota(username, size)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = db.execute("INSERT INTO assignments (student, course_code, filename, timestamp, sha256, size, original_size, "
+                     "media_status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (username, course_code, filename, timestamp, digest, size, size,
+                      "pending" if images.available() else "skipped"))
+    if images.available():
+        images.submit(cur.lastrowid)
+    return storage.blob_path(digest)
@@ -0,0 +1,133 @@
+# hostel.py
+"""Hostel rooms and batch allocation of applications.
+
+Applications (``hostel`` rows) carry the student's preferences in
+``room_number``: room numbers or block names, most preferred first, separated
+by commas. ``allocate`` assigns every Pending or Waitlisted application in one
+pass, in application (id) order, so earlier applicants get their preferences
+first and nobody displaces them (serial dictatorship). Each applicant takes
+the first preference with a free bed; if none has one, they take the first
+free bed in their first preferred block and then anywhere. Rooms that fill up
+are dropped from the candidate queues as they are reached, so the pass is
+linear in applications plus rooms.
+
+Decisions are written with one executemany of primary-key UPDATEs, inside
+the same write transaction that read the occupancy, so concurrent allocations
+cannot overfill a room.
+"""
+import json
+from collections import deque
+
+import db
+
+STATUSES = ("Pending", "Approved", "Waitlisted", "Duplicate", "Vacated")
+
+APPLY_DECISION = "UPDATE hostel SET status=?, allocated_room=? WHERE id=?"
+
+def add_room(room_number, block="", capacity=1):
+    """Create a room or change its block and capacity."""
+    db.execute("INSERT INTO hostel_rooms (room_number, block, capacity) VALUES (?, ?, ?) "
+               "ON CONFLICT (room_number) DO UPDATE SET block = excluded.block, capacity = excluded.capacity",
+               (room_number, block, int(capacity)))
+
+def add_rooms(rows):
+    """Upsert ``(room_number, block, capacity)`` rows in one transaction."""
+    with db.transaction(write=True) as conn:
+        conn.executemany("INSERT INTO hostel_rooms (room_number, block, capacity) VALUES (?, ?, ?) "
+                         "ON CONFLICT (room_number) DO UPDATE SET block = excluded.block, capacity = excluded.capacity",
+                         rows)
+
+def rooms():
+    """``(room_number, block, capacity, occupied)`` for every room."""
+    return db.query("SELECT r.room_number, r.block, r.capacity, count(h.id) FROM hostel_rooms AS r "
+                    "LEFT JOIN hostel AS h ON h.status = 'Approved' AND h.allocated_room = r.room_number "
+                    "GROUP BY r.room_number ORDER BY r.block, r.room_number")
+
+def applications(statuses=STATUSES):
+    """Hostel applications whose status is one of ``statuses``, oldest first."""
+    return db.query("SELECT * FROM hostel WHERE status IN (SELECT value FROM json_each(?)) ORDER BY id",
+                    (json.dumps(list(statuses)),))
+
+def vacate(student):
+    """Release the student's bed. Returns True if they had one."""
+    cur = db.execute("UPDATE hostel SET status='Vacated' WHERE student=? AND status='Approved'", (student,))
+    return cur.rowcount > 0
+
+def preferences(text):
+    return [p.strip() for p in (text or "").split(",") if p.strip()]
+
+class _Beds:
+    """Free beds per room, with per-block and global queues of rooms that may still have space."""
+
+    def __init__(self, rooms, occupied):
+        self.free = {}
+        self.block_of = {}
+        self.blocks = {}
+        self.anywhere = deque()
+        for room, block, capacity in rooms:
+            self.free[room] = capacity - occupied.get(room, 0)
+            self.block_of[room] = block
+            if self.free[room] > 0:
+                self.blocks.setdefault(block, deque()).append(room)
+                self.anywhere.append(room)
+
+    def _first_free(self, queue):
+        while queue and self.free[queue[0]] <= 0:
+            queue.popleft()
+        return queue[0] if queue else None
+
+    def pick(self, prefs, fallback=True):
+        for p in prefs:
+            if self.free.get(p, 0) > 0:
+                return p
+            if p in self.blocks:
+                room = self._first_free(self.blocks[p])
+                if room is not None:
+                    return room
+        if not fallback:
+            return None
+        for p in prefs[:1]:
+            block = self.block_of.get(p, p)
+            if block in self.blocks:
+                room = self._first_free(self.blocks[block])
+                if room is not None:
+                    return room
+        return self._first_free(self.anywhere)
+
+    def take(self, room):
+        self.free[room] -= 1
+
+def allocate(fallback=True, dry_run=False):
+    """Assign every Pending and Waitlisted application; returns counts per outcome.
+
+    With ``fallback`` False, applicants whose preferences are all full are
+    waitlisted instead of being given any free bed. ``dry_run`` computes the
+    outcome without writing it.
+    """
+    with db.transaction(write=True) as conn:
+        room_rows = conn.execute("SELECT room_number, block, capacity FROM hostel_rooms ORDER BY block, room_number").fetchall()
+        occupied = dict(conn.execute("SELECT allocated_room, count(*) FROM hostel WHERE status='Approved' "
+                                     "GROUP BY allocated_room").fetchall())
+        housed = {r[0] for r in conn.execute("SELECT DISTINCT student FROM hostel WHERE status='Approved'")}
+        pending = conn.execute("SELECT id, student, room_number FROM hostel WHERE status IN ('Pending', 'Waitlisted') "
+                               "ORDER BY id").fetchall()
+        beds = _Beds(room_rows, occupied)
+        decisions = []
+        for app_id, student, prefs in pending:
+            if student in housed:
+                decisions.append((app_id, "Duplicate", None))
+                continue
+            room = beds.pick(preferences(prefs), fallback)
+            if room is None:
+                decisions.append((app_id, "Waitlisted", None))
+                continue
+            beds.take(room)
+            housed.add(student)
+            decisions.append((app_id, "Approved", room))
+        if decisions and not dry_run:
+            conn.executemany(APPLY_DECISION, ((status, room, app_id) for app_id, status, room in decisions))
+    counts = {status: 0 for status in ("Approved", "Waitlisted", "Duplicate")}
+    for _, status, _ in decisions:
+        counts[status] += 1
+    counts["free_beds"] = sum(max(n, 0) for n in beds.free.values())
+    return counts
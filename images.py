@@ -0,0 +1,151 @@
+# images.py
+"""Background transcoding of camera captures.
+
+``st.camera_input`` hands over full-size PNGs. save_camera_image stores the
+capture as-is, records it with ``media_status='pending'`` and queues it
+here, so the upload returns as soon as the raw bytes are on disk. A pool of
+worker threads (Pillow releases the GIL while decoding, resizing and
+encoding) then:
+
+* transcodes the capture to WebP at QUALITY, downscaled to MAX_DIMENSION,
+  keeping the original if that is not smaller;
+* stores a THUMB_SIZE thumbnail for list views;
+* points the assignments row at the new blob, with ``original_size`` and the
+  new ``size``. The raw blob is then unreferenced and ``storage gc`` removes it.
+
+Pending captures are re-queued on startup. Without Pillow installed captures
+are kept as they are and marked ``skipped``.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import metrics
+import storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: pip install pillow
+    Image = None
+
+FORMAT = "WEBP"
+EXTENSION = ".webp"
+QUALITY = int(os.environ.get("MYUNISPACE_IMAGE_QUALITY", "75"))
+MAX_DIMENSION = int(os.environ.get("MYUNISPACE_IMAGE_MAX_DIMENSION", "2000"))
+THUMB_SIZE = 256
+THUMB_QUALITY = 60
+WORKERS = os.cpu_count() or 2
+
+log = logging.getLogger(__name__)
+
+def available():
+    return Image is not None
+
+def _encode(image, quality):
+    buf = io.BytesIO()
+    image.save(buf, FORMAT, quality=quality, method=4)
+    buf.seek(0)
+    return buf
+
+def transcode(path):
+    """Return ``(compressed, thumbnail)`` as file objects; ``compressed`` is None if it would not be smaller."""
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    if max(image.size) > MAX_DIMENSION:
+        image.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+    compressed = _encode(image, QUALITY)
+    if compressed.getbuffer().nbytes >= os.path.getsize(path):
+        compressed = None
+    image.thumbnail((THUMB_SIZE, THUMB_SIZE))
+    return compressed, _encode(image, THUMB_QUALITY)
+
+def process(assignment_id):
+    """Transcode one pending capture and update its row. Returns the new status."""
+    row = db.query_one("SELECT filename, sha256, size FROM assignments WHERE id=? AND media_status='pending'",
+                       (assignment_id,))
+    if row is None:
+        return None
+    filename, digest, size = row
+    with metrics.registry.timer("file_io", "images.transcode", size):
+        try:
+            compressed, thumb = transcode(storage.blob_path(digest))
+        except Exception:
+            log.exception("could not transcode assignment %s", assignment_id)
+            db.execute("UPDATE assignments SET media_status='failed' WHERE id=? AND media_status='pending'",
+                       (assignment_id,))
+            return "failed"
+        thumb_digest, _ = storage.store(thumb)
+        if compressed is not None:
+            digest, size = storage.store(compressed)
+            filename = os.path.splitext(filename)[0] + EXTENSION
+    db.execute("UPDATE assignments SET filename=?, sha256=?, size=?, thumb_sha256=?, media_status='done' "
+               "WHERE id=? AND media_status='pending'", (filename, digest, size, thumb_digest, assignment_id))
+    return "done"
+
+def savings():
+    """``{"images", "original_bytes", "stored_bytes", "saved_pct", "pending"}`` over transcoded captures."""
+    images, original, stored = db.query_one(
+        "SELECT count(*), coalesce(sum(original_size), 0), coalesce(sum(size), 0) FROM assignments "
+        "WHERE media_status='done'")
+    pending = db.query_one("SELECT count(*) FROM assignments WHERE media_status='pending'")[0]
+    return {"images": images, "original_bytes": original, "stored_bytes": stored,
+            "saved_pct": round(100 * (1 - stored / original), 1) if original else 0.0, "pending": pending}
+
+# ---------------------- Worker pool ----------------------
+class ImageProcessor:
+    def __init__(self, workers=WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="images")
+        self._lock = threading.Lock()
+        self._futures = set()
+
+    def submit(self, assignment_id):
+        future = self._executor.submit(process, assignment_id)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def resume_pending(self):
+        """Re-queue captures left pending, e.g. by a restart. Returns how many."""
+        ids = [r[0] for r in db.query("SELECT id FROM assignments WHERE media_status='pending' ORDER BY id")]
+        for assignment_id in ids:
+            self.submit(assignment_id)
+        return len(ids)
+
+    def queued(self):
+        with self._lock:
+            return len(self._futures)
+
+    def wait(self):
+        """Block until everything submitted so far has been processed."""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+_processor = None
+_processor_lock = threading.Lock()
+
+def get_processor():
+    """The process-wide image processor, started (and pending captures resumed) on first use."""
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                _processor = ImageProcessor()
+                _processor.resume_pending()
+    return _processor
+
+def submit(assignment_id):
+    return get_processor().submit(assignment_id)
@@ -0,0 +1,106 @@
+# inbox.py
+"""Message inboxes: read state, unread counters and incremental fetches.
+
+``inbox_counters`` holds each user's unread count and newest message id,
+maintained by triggers on ``messages`` in the same transaction as the insert
+(send_message writes behind, so the counter moves when the batch commits).
+A session keeps the id of the newest message it has loaded and fetches only
+rows after it, and only when the counter says there are any.
+
+``counters`` is what badges poll. It checks ``PRAGMA data_version`` on a
+private connection first: that number only changes when some connection
+commits, so between writes the answer comes from memory without touching
+any table.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+import db
+
+PAGE_SIZE = 50
+COLUMNS = "id, sender, message, timestamp, read_at"
+
+def recent(username, limit=PAGE_SIZE):
+    """The newest ``limit`` messages, oldest first."""
+    rows = db.query(f"SELECT {COLUMNS} FROM messages WHERE receiver=? ORDER BY id DESC LIMIT ?", (username, limit))
+    return rows[::-1]
+
+def since(username, after_id, limit=1000):
+    """Messages newer than ``after_id``, oldest first."""
+    return db.query(f"SELECT {COLUMNS} FROM messages WHERE receiver=? AND id > ? ORDER BY id LIMIT ?",
+                    (username, after_id, limit))
+
+def before(username, before_id, limit=PAGE_SIZE):
+    """Up to ``limit`` messages older than ``before_id``, oldest first."""
+    rows = db.query(f"SELECT {COLUMNS} FROM messages WHERE receiver=? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (username, before_id, limit))
+    return rows[::-1]
+
+def mark_read(username, up_to=None, ids=None):
+    """Mark unread messages read: specific ``ids``, everything up to id ``up_to``, or all. Returns the count."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    sql = "UPDATE messages SET read_at=? WHERE receiver=? AND read_at IS NULL"
+    params = [now, username]
+    if ids is not None:
+        sql += " AND id IN (SELECT value FROM json_each(?))"
+        params.append("[" + ",".join(str(int(i)) for i in ids) + "]")
+    elif up_to is not None:
+        sql += " AND id <= ?"
+        params.append(up_to)
+    return db.execute(sql, params).rowcount
+
+# ---------------------- Change detection ----------------------
+class CounterWatcher:
+    """Per-user ``(unread, last_id)`` served from memory until the database changes."""
+
+    def __init__(self):
+        self._conn = None
+        self._db_file = None
+        self._version = None
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _data_version(self):
+        db_file = db.get_pool().db_file
+        if db_file != self._db_file:
+            if self._conn is not None:
+                self._conn.close()
+            # Never writes, so every commit it sees comes from another connection.
+            self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+            self._db_file = db_file
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def counters(self, username):
+        with self._lock:
+            version = self._data_version()
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            cached = self._cache.get(username)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+        row = db.query_one("SELECT unread, last_id FROM inbox_counters WHERE username=?", (username,))
+        result = (row[0], row[1]) if row else (0, 0)
+        with self._lock:
+            # A commit since ``version`` was read may not be in ``row``; only cache against that version.
+            if self._version == version:
+                self._cache[username] = result
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+watcher = CounterWatcher()
+
+def counters(username):
+    """``(unread, last_id)`` for the user's inbox."""
+    return watcher.counters(username)
+
+def unread(username):
+    return counters(username)[0]
@@ -0,0 +1,226 @@
+# manage.py
+"""Bulk import/export for the MyUniSpace database.
+
+    python manage.py import users students.csv [--batch-size 10000] [--workers N]
+    python manage.py import payments payments.jsonl
+    python manage.py export payments --format parquet --out payments.parquet
+
+Imports stream the input file in batches, each written with one executemany
+in its own transaction. For users, plaintext ``password`` values are hashed;
+a ``password_hash`` column is stored as-is. hash_password is a single
+SHA-256, cheaper than shipping a batch to another process, so hashing is
+inline by default. With ``--workers N`` each batch is split across a process
+pool while the previous batch is inserted, which pays off for a slow
+password KDF. Exports stream rows from a cursor with fetchmany, so neither
+direction loads a whole table into memory.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+import db
+from helpers import hash_password
+
+BATCH_SIZE = 10_000
+
+# table -> (columns, insert verb). Tables with a natural unique key skip rows
+# that already exist instead of aborting the batch.
+IMPORTABLE = {
+    "users": (["role", "full_name", "student_id", "username", "email", "phone", "password"], "INSERT OR IGNORE"),
+    "courses": (["course_code", "course_name"], "INSERT"),
+    "registrations": (["student", "course_code"], "INSERT OR IGNORE"),
+    "exams": (["course_code", "exam_date", "start_time", "end_time", "center"], "INSERT"),
+    "payments": (["student", "amount", "status", "timestamp"], "INSERT"),
+}
+# Columns with a table default, left out of the insert when the input has no such field.
+DEFAULTED = {
+    "exams": ("start_time", "end_time"),
+}
+
+# ---------------------- Readers ----------------------
+def read_records(path):
+    """Yield dicts from a .csv or .jsonl/.ndjson file, one at a time."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if ext == ".csv":
+            yield from csv.DictReader(f)
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise SystemExit(f"Unsupported input format {ext!r} (use .csv or .jsonl)")
+
+def batches(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def hash_passwords(passwords):
+    return [hash_password(p) if p else None for p in passwords]
+
+# ---------------------- Import ----------------------
+def import_file(table, path, batch_size=BATCH_SIZE, workers=0, progress=None):
+    """Import ``path`` into ``table``. Returns ``(rows_read, rows_inserted, seconds)``."""
+    columns, verb = IMPORTABLE[table]
+    records = read_records(path)
+    first = next(records, None)
+    if first is None:
+        return 0, 0, 0.0
+    records = chain([first], records)
+    columns = [c for c in columns if c in first or c not in DEFAULTED.get(table, ())]
+    sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    start = time.perf_counter()
+    read = inserted = 0
+
+    def write(rows):
+        nonlocal read, inserted
+        with db.transaction(write=True) as conn:
+            # rowcount, not total_changes: rows written by triggers are not imported rows.
+            inserted += conn.executemany(sql, rows).rowcount
+        read += len(rows)
+        if progress:
+            progress(read, inserted, time.perf_counter() - start)
+
+    if table != "users":
+        for batch in batches(records, batch_size):
+            write([tuple(rec.get(c) for c in columns) for rec in batch])
+        return read, inserted, time.perf_counter() - start
+
+    workers = (os.cpu_count() or 1) if workers < 0 else workers
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        # Pipeline: hash batch N in the pool, one chunk per worker, while batch N-1 is inserted.
+        pending = None
+        for batch in batches(records, batch_size):
+            rows = [[rec.get(c) for c in columns] for rec in batch]
+            plain = [rec.get("password") for rec in batch]
+            stored = [rec.get("password_hash") for rec in batch]
+            if pool:
+                size = len(plain) // workers + 1
+                hashed = [pool.submit(hash_passwords, plain[i:i + size]) for i in range(0, len(plain), size)]
+            else:
+                hashed = hash_passwords(plain)
+            if pending:
+                write(finish_users(*pending))
+            pending = (rows, hashed, stored)
+        if pending:
+            write(finish_users(*pending))
+    finally:
+        if pool:
+            pool.shutdown()
+    return read, inserted, time.perf_counter() - start
+
+def finish_users(rows, hashed, stored):
+    if hashed and hasattr(hashed[0], "result"):
+        hashed = [h for future in hashed for h in future.result()]
+    for row, h, s in zip(rows, hashed, stored):
+        row[-1] = s or h
+    return rows
+
+# ---------------------- Export ----------------------
+def table_columns(conn, table):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    if not exists:
+        raise SystemExit(f"No such table: {table}")
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+def arrow_schema(pa, conn, table):
+    """Arrow schema from the declared column types, so all-NULL batches still get a concrete type."""
+    fields = []
+    for _, name, declared, *_ in conn.execute(f'PRAGMA table_info("{table}")'):
+        declared = (declared or "").upper()
+        if "INT" in declared:
+            fields.append((name, pa.int64()))
+        elif any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+            fields.append((name, pa.float64()))
+        else:
+            fields.append((name, pa.string()))
+    return pa.schema(fields)
+
+def export_table(table, out, fmt="csv", batch_size=BATCH_SIZE):
+    """Stream ``table`` to ``out`` as csv, jsonl or parquet. Returns the row count."""
+    count = 0
+    with db.transaction() as conn:
+        columns = table_columns(conn, table)
+        cur = conn.execute(f'SELECT * FROM "{table}" ORDER BY rowid')
+        chunks = iter(lambda: cur.fetchmany(batch_size), [])
+        if fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+            schema = arrow_schema(pa, conn, table)
+            text = [i for i, field in enumerate(schema) if pa.types.is_string(field.type)]
+            with pq.ParquetWriter(out, schema) as writer:
+                for rows in chunks:
+                    if text:
+                        rows = [list(r) for r in rows]
+                        for r in rows:
+                            for i in text:
+                                if r[i] is not None and not isinstance(r[i], str):
+                                    r[i] = str(r[i])
+                    writer.write_table(pa.Table.from_pylist([dict(zip(columns, r)) for r in rows], schema=schema))
+                    count += len(rows)
+            return count
+        with open(out, "w", newline="", encoding="utf-8") as f:
+            if fmt == "csv":
+                w = csv.writer(f)
+                w.writerow(columns)
+                for rows in chunks:
+                    w.writerows(rows)
+                    count += len(rows)
+            elif fmt == "jsonl":
+                for rows in chunks:
+                    f.writelines(json.dumps(dict(zip(columns, r)), ensure_ascii=False) + "\n" for r in rows)
+                    count += len(rows)
+            else:
+                raise SystemExit(f"Unknown export format: {fmt}")
+    return count
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python manage.py", description="MyUniSpace bulk data tools")
+    parser.add_argument("--db", default=db.DB_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="import a CSV or JSONL file into a table")
+    imp.add_argument("table", choices=sorted(IMPORTABLE))
+    imp.add_argument("path")
+    imp.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    imp.add_argument("--workers", type=int, default=0,
+                     help="password hashing processes (default 0: hash inline, -1: one per CPU)")
+
+    exp = sub.add_parser("export", help="stream a table to CSV, JSONL or Parquet")
+    exp.add_argument("table")
+    exp.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    exp.add_argument("--out", help="output file (default: <table>.<format>)")
+    exp.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args(argv)
+    db.init(args.db)
+
+    if args.command == "import":
+        def progress(read, inserted, elapsed):
+            sys.stderr.write(f"\r{read} rows read, {inserted} inserted, {read / elapsed if elapsed else 0:.0f} rows/s")
+        read, inserted, elapsed = import_file(args.table, args.path, args.batch_size, args.workers, progress)
+        sys.stderr.write("\n")
+        print(f"Imported {inserted} of {read} rows into {args.table} in {elapsed:.2f}s "
+              f"({read / elapsed if elapsed else 0:.0f} rows/s)")
+    else:
+        out = args.out or f"{args.table}.{args.format}"
+        start = time.perf_counter()
+        count = export_table(args.table, out, args.format, args.batch_size)
+        print(f"Exported {count} rows from {args.table} to {out} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# metrics.py
+"""In-process latency metrics: queries, dashboard sections, PDF renders, file I/O.
+
+Every observation is keyed by ``(kind, name)``. For each key we keep a
+cumulative histogram (for Prometheus), a reservoir of recent samples (for
+p50/p95/p99), a row/byte total and the call sites that issued it. Queries
+slower than SLOW_QUERY_MS are logged to the ``myunispace.slow`` logger.
+"""
+import bisect
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("MYUNISPACE_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("MYUNISPACE_SLOW_QUERY_MS", "200"))
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESERVOIR = 2048
+MAX_SERIES = 1000
+
+slow_log = logging.getLogger("myunispace.slow")
+
+# Frames from these files are skipped when looking for the caller of a query.
+_INTERNAL_FILES = {"db.py", "metrics.py", "contextlib.py", "cache.py", "threading.py", "writebehind.py"}
+
+class Series:
+    __slots__ = ("count", "total", "rows", "max", "buckets", "recent", "sites")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=RESERVOIR)
+        self.sites = Counter()
+
+    def percentile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Registry:
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, kind, name, seconds, rows=0, site=None):
+        """Record one observation. ``rows`` is rows for queries and bytes for file I/O."""
+        with self._lock:
+            series = self._series.get((kind, name))
+            if series is None:
+                if len(self._series) >= MAX_SERIES:
+                    return
+                series = self._series[(kind, name)] = Series()
+            series.count += 1
+            series.total += seconds
+            series.rows += rows or 0
+            series.max = max(series.max, seconds)
+            series.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            series.recent.append(seconds)
+            if site:
+                series.sites[site] += 1
+        section = getattr(self._local, "section", None)
+        if kind == "query" and section is not None:
+            section[1] += 1
+
+    def observe_query(self, sql, seconds, rows=0):
+        site = getattr(self._local, "site", None) or call_site()
+        self.observe("query", normalize_sql(sql), seconds, rows, site)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            slow_log.warning("slow query %.1f ms (%s rows) at %s: %s", seconds * 1000, rows, site, normalize_sql(sql))
+
+    @contextmanager
+    def attributed_to(self, site):
+        """Attribute queries on this thread to ``site``, for work done on behalf of another caller."""
+        previous = getattr(self._local, "site", None)
+        self._local.site = site
+        try:
+            yield
+        finally:
+            self._local.site = previous
+
+    @contextmanager
+    def timer(self, kind, name, rows=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, rows)
+
+    def timed(self, kind, name=None):
+        """Decorator form of ``timer``."""
+        def decorate(fn):
+            label = name or fn.__qualname__
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(kind, label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def section(self, name):
+        """End the current dashboard section on this thread (if any) and start ``name``.
+
+        Sections are split timers, so a dashboard is instrumented by calling
+        this at each heading and ``end_section()`` at the bottom. Queries run
+        while a section is open are counted against it.
+        """
+        self.end_section()
+        self._local.section = [name, 0, time.perf_counter()]
+
+    def end_section(self, record=True):
+        """Close the open section; ``record=False`` drops one cut short by a rerun."""
+        section = getattr(self._local, "section", None)
+        if section is None:
+            return
+        self._local.section = None
+        if record:
+            name, queries, start = section
+            self.observe("section", name, time.perf_counter() - start, queries)
+
+    def snapshot(self):
+        """Rows for display: one dict per series, slowest p95 first."""
+        with self._lock:
+            items = list(self._series.items())
+            rows = [{
+                "kind": kind,
+                "name": name,
+                "calls": s.count,
+                "p50_ms": round(s.percentile(0.50) * 1000, 3),
+                "p95_ms": round(s.percentile(0.95) * 1000, 3),
+                "p99_ms": round(s.percentile(0.99) * 1000, 3),
+                "max_ms": round(s.max * 1000, 3),
+                "total_ms": round(s.total * 1000, 1),
+                "rows": s.rows,
+                "call_sites": ", ".join(f"{site} ({n})" for site, n in s.sites.most_common(3)),
+            } for (kind, name), s in items]
+        return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+    def prometheus(self):
+        """All series in the Prometheus text exposition format."""
+        out = [
+            "# HELP myunispace_duration_seconds Latency of queries, dashboard sections, PDF renders and file I/O.",
+            "# TYPE myunispace_duration_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+            for (kind, name), s in items:
+                labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), s.buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f'myunispace_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                out.append(f"myunispace_duration_seconds_sum{{{labels}}} {s.total}")
+                out.append(f"myunispace_duration_seconds_count{{{labels}}} {s.count}")
+            out.append("# HELP myunispace_rows_total Rows returned or changed (queries), bytes (file I/O), queries run (sections).")
+            out.append("# TYPE myunispace_rows_total counter")
+            for (kind, name), s in items:
+                out.append(f'myunispace_rows_total{{kind="{_escape(kind)}",name="{_escape(name)}"}} {s.rows}')
+        return "\n".join(out) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql):
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return sql if len(sql) <= 200 else sql[:197] + "..."
+
+def call_site():
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES:
+            return f"{filename}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+registry = Registry()
+observe = registry.observe
+observe_query = registry.observe_query
+timer = registry.timer
+attributed_to = registry.attributed_to
+timed = registry.timed
+section = registry.section
+end_section = registry.end_section
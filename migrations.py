@@ -0,0 +1,399 @@
+# migrations.py
+"""Versioned schema migrations.
+
+Each entry in MIGRATIONS is ``(version, name, steps)`` where a step is either
+a SQL statement or a callable taking the connection. Applied versions are
+recorded in ``schema_migrations`` and mirrored into ``PRAGMA user_version`` so
+startup can tell the schema is current without touching any table.
+"""
+from datetime import datetime
+
+# Baseline tables, as originally created by app.py.
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        role TEXT,
+        full_name TEXT,
+        student_id TEXT,
+        username TEXT UNIQUE,
+        email TEXT,
+        phone TEXT,
+        password TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sender TEXT,
+        receiver TEXT,
+        message TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS courses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        course_code TEXT,
+        course_name TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS registrations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT,
+        course_code TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS exams (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        course_code TEXT,
+        exam_date TEXT,
+        center TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT,
+        course_code TEXT,
+        date TEXT,
+        status TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS assignments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT,
+        course_code TEXT,
+        filename TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT,
+        amount REAL,
+        status TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS hostel (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT,
+        room_number TEXT,
+        status TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS forum (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user TEXT,
+        message TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS elections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT,
+        candidate TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS library (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        author TEXT,
+        available INTEGER
+    )''',
+    '''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        company TEXT,
+        description TEXT,
+        contact TEXT
+    )''',
+]
+
+def dedupe_registrations(conn):
+    conn.execute("""DELETE FROM registrations WHERE id NOT IN (
+        SELECT min(id) FROM registrations GROUP BY student, course_code
+    )""")
+
+def version_trigger(name, event, table, source, key):
+    """Trigger that bumps data_versions(source, key) whenever ``table`` changes."""
+    return f"""CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN
+        INSERT INTO data_versions (source, key, version, updated_at)
+        VALUES ('{source}', {key}, 1, datetime('now', 'localtime'))
+        ON CONFLICT (source, key) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+    END"""
+
+# Rendered documents are cached against these counters (see documents.py).
+DATA_VERSIONS = [
+    """CREATE TABLE IF NOT EXISTS data_versions (
+        source TEXT NOT NULL,
+        key TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        updated_at TEXT,
+        PRIMARY KEY (source, key)
+    )""",
+    """INSERT OR IGNORE INTO data_versions (source, key, version, updated_at)
+        SELECT 'exams', '', 1, datetime('now', 'localtime') FROM exams LIMIT 1""",
+    """INSERT OR IGNORE INTO data_versions (source, key, version, updated_at)
+        SELECT 'payments', student, 1, max(timestamp) FROM payments GROUP BY student""",
+    version_trigger("tr_exams_version_insert", "INSERT", "exams", "exams", "''"),
+    version_trigger("tr_exams_version_update", "UPDATE", "exams", "exams", "''"),
+    version_trigger("tr_exams_version_delete", "DELETE", "exams", "exams", "''"),
+    version_trigger("tr_payments_version_insert", "INSERT", "payments", "payments", "NEW.student"),
+    version_trigger("tr_payments_version_update", "UPDATE", "payments", "payments", "NEW.student"),
+    version_trigger("tr_payments_version_delete", "DELETE", "payments", "payments", "OLD.student"),
+]
+
+def fts_index(table, columns):
+    """External-content FTS5 index over ``columns`` of ``table``, kept in sync by triggers."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_{fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_{fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_{fts}_update AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new});
+        END""",
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+# Ballots stay in ``elections``; each is now cast for an (election, position).
+# Only a student's first ballot per position is kept.
+ELECTION_TALLY = [
+    "ALTER TABLE elections ADD COLUMN election TEXT NOT NULL DEFAULT 'General'",
+    "ALTER TABLE elections ADD COLUMN position TEXT NOT NULL DEFAULT 'General'",
+    """DELETE FROM elections WHERE id NOT IN (
+        SELECT min(id) FROM elections GROUP BY election, position, student
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_elections_ballot ON elections (election, position, student)",
+    """CREATE TABLE IF NOT EXISTS election_positions (
+        election TEXT NOT NULL,
+        position TEXT NOT NULL,
+        PRIMARY KEY (election, position)
+    )""",
+    "INSERT OR IGNORE INTO election_positions (election, position) VALUES ('General', 'General')",
+    """CREATE TABLE IF NOT EXISTS election_tally (
+        election TEXT NOT NULL,
+        position TEXT NOT NULL,
+        candidate TEXT NOT NULL,
+        votes INTEGER NOT NULL,
+        PRIMARY KEY (election, position, candidate)
+    )""",
+    """INSERT OR REPLACE INTO election_tally (election, position, candidate, votes)
+        SELECT election, position, candidate, count(*) FROM elections GROUP BY election, position, candidate""",
+    """CREATE TRIGGER IF NOT EXISTS tr_election_tally_insert AFTER INSERT ON elections BEGIN
+        INSERT INTO election_tally (election, position, candidate, votes)
+        VALUES (new.election, new.position, new.candidate, 1)
+        ON CONFLICT (election, position, candidate) DO UPDATE SET votes = votes + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_election_tally_delete AFTER DELETE ON elections BEGIN
+        UPDATE election_tally SET votes = votes - 1
+        WHERE election = old.election AND position = old.position AND candidate = old.candidate;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_election_tally_update AFTER UPDATE ON elections BEGIN
+        UPDATE election_tally SET votes = votes - 1
+        WHERE election = old.election AND position = old.position AND candidate = old.candidate;
+        INSERT INTO election_tally (election, position, candidate, votes)
+        VALUES (new.election, new.position, new.candidate, 1)
+        ON CONFLICT (election, position, candidate) DO UPDATE SET votes = votes + 1;
+    END""",
+]
+
+# Present/absent counters per (course_code, student) and per (course_code, date),
+# kept in step with ``attendance`` by triggers in the writing transaction.
+def attendance_rollup(table, key):
+    match_old = " AND ".join(f"{k} = old.{k}" for k in ("course_code", key))
+    upsert_new = f"""INSERT INTO {table} (course_code, {key}, present, absent)
+        VALUES (new.course_code, new.{key}, new.status = 'Present', new.status = 'Absent')
+        ON CONFLICT (course_code, {key}) DO UPDATE
+        SET present = present + excluded.present, absent = absent + excluded.absent;"""
+    subtract_old = f"""UPDATE {table} SET present = present - (old.status = 'Present'), absent = absent - (old.status = 'Absent')
+        WHERE {match_old};"""
+    return [
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            course_code TEXT NOT NULL,
+            {key} TEXT NOT NULL,
+            present INTEGER NOT NULL DEFAULT 0,
+            absent INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_code, {key})
+        )""",
+        f"""INSERT OR REPLACE INTO {table} (course_code, {key}, present, absent)
+            SELECT course_code, {key}, sum(status = 'Present'), sum(status = 'Absent')
+            FROM attendance WHERE course_code IS NOT NULL AND {key} IS NOT NULL GROUP BY course_code, {key}""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_{table}_insert AFTER INSERT ON attendance BEGIN
+        {upsert_new}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_{table}_delete AFTER DELETE ON attendance BEGIN
+        {subtract_old}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_{table}_update AFTER UPDATE ON attendance BEGIN
+        {subtract_old}
+        {upsert_new}
+    END""",
+    ]
+
+# One row per receiver: unread messages and the newest message id, kept in
+# step with ``messages`` by triggers so badges and "anything new?" checks read
+# one row instead of the message table (see inbox.py).
+INBOX_COUNTERS = [
+    """CREATE TABLE IF NOT EXISTS inbox_counters (
+        username TEXT PRIMARY KEY,
+        unread INTEGER NOT NULL DEFAULT 0,
+        last_id INTEGER NOT NULL DEFAULT 0
+    )""",
+    """INSERT OR REPLACE INTO inbox_counters (username, unread, last_id)
+        SELECT receiver, count(*), max(id) FROM messages WHERE receiver IS NOT NULL GROUP BY receiver""",
+    """CREATE TRIGGER IF NOT EXISTS tr_messages_inbox_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO inbox_counters (username, unread, last_id) VALUES (NEW.receiver, NEW.read_at IS NULL, NEW.id)
+        ON CONFLICT (username) DO UPDATE SET unread = unread + excluded.unread, last_id = max(last_id, excluded.last_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_messages_inbox_read AFTER UPDATE OF read_at ON messages
+        WHEN (OLD.read_at IS NULL) != (NEW.read_at IS NULL) BEGIN
+        UPDATE inbox_counters SET unread = unread + (NEW.read_at IS NULL) - (OLD.read_at IS NULL)
+            WHERE username = NEW.receiver;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_messages_inbox_delete AFTER DELETE ON messages WHEN OLD.read_at IS NULL BEGIN
+        UPDATE inbox_counters SET unread = unread - 1 WHERE username = OLD.receiver;
+    END""",
+]
+
+MIGRATIONS = [
+    (1, "baseline schema", SCHEMA),
+    (2, "indexes on hot lookup columns", [
+        dedupe_registrations,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_registrations_student_course ON registrations (student, course_code)",
+        "CREATE INDEX IF NOT EXISTS ix_assignments_student ON assignments (student, id)",
+        "CREATE INDEX IF NOT EXISTS ix_assignments_course ON assignments (course_code, id)",
+        "CREATE INDEX IF NOT EXISTS ix_messages_receiver ON messages (receiver, id)",
+        "CREATE INDEX IF NOT EXISTS ix_payments_student ON payments (student, id)",
+        "CREATE INDEX IF NOT EXISTS ix_hostel_student ON hostel (student, id)",
+        "CREATE INDEX IF NOT EXISTS ix_hostel_status ON hostel (status)",
+        "CREATE INDEX IF NOT EXISTS ix_users_role ON users (role, username)",
+    ]),
+    (3, "content-addressed assignment uploads", [
+        "ALTER TABLE assignments ADD COLUMN sha256 TEXT",
+        "ALTER TABLE assignments ADD COLUMN size INTEGER",
+        "CREATE INDEX IF NOT EXISTS ix_assignments_sha256 ON assignments (sha256)",
+    ]),
+    (4, "data version counters for exams and payments", DATA_VERSIONS),
+    (5, "full-text search for library, forum and jobs",
+        fts_index("library", ["title", "author"])
+        + fts_index("forum", ["user", "message"])
+        + fts_index("jobs", ["title", "company", "description"])),
+    (6, "one attendance row per student, course and day", [
+        """DELETE FROM attendance WHERE id NOT IN (
+            SELECT max(id) FROM attendance GROUP BY student, course_code, date
+        )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_attendance_student_course_date ON attendance (student, course_code, date)",
+        "CREATE INDEX IF NOT EXISTS ix_registrations_course ON registrations (course_code, student)",
+    ]),
+    (7, "one ballot per student per position, trigger-maintained tally", ELECTION_TALLY),
+    (8, "asynchronous payments", [
+        "ALTER TABLE payments ADD COLUMN idempotency_key TEXT",
+        "ALTER TABLE payments ADD COLUMN reference TEXT",
+        "ALTER TABLE payments ADD COLUMN updated_at TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_payments_idempotency_key ON payments (idempotency_key)",
+        "CREATE INDEX IF NOT EXISTS ix_payments_reference ON payments (reference)",
+        "CREATE INDEX IF NOT EXISTS ix_payments_pending ON payments (id) WHERE status = 'PENDING'",
+    ]),
+    (9, "API bearer tokens", [
+        """CREATE TABLE IF NOT EXISTS api_tokens (
+            token_hash TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            role TEXT NOT NULL,
+            expires REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_api_tokens_expires ON api_tokens (expires)",
+    ]),
+    (10, "hostel rooms with capacity and allocated rooms", [
+        """CREATE TABLE IF NOT EXISTS hostel_rooms (
+            room_number TEXT PRIMARY KEY,
+            block TEXT NOT NULL DEFAULT '',
+            capacity INTEGER NOT NULL CHECK (capacity >= 0)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_hostel_rooms_block ON hostel_rooms (block, room_number)",
+        "ALTER TABLE hostel ADD COLUMN allocated_room TEXT",
+        # Occupancy is a count of Approved rows per room; this index answers it.
+        "DROP INDEX IF EXISTS ix_hostel_status",
+        "CREATE INDEX IF NOT EXISTS ix_hostel_status_room ON hostel (status, allocated_room)",
+    ]),
+    (11, "attendance rollups per student and per session",
+        attendance_rollup("attendance_student_rollup", "student")
+        + attendance_rollup("attendance_daily_rollup", "date")
+        + ["CREATE INDEX IF NOT EXISTS ix_attendance_student_rollup_student ON attendance_student_rollup (student)"]),
+    (12, "timed exam slots, exam centre capacities, registration versions", [
+        "ALTER TABLE exams ADD COLUMN start_time TEXT NOT NULL DEFAULT '09:00'",
+        "ALTER TABLE exams ADD COLUMN end_time TEXT NOT NULL DEFAULT '12:00'",
+        "CREATE INDEX IF NOT EXISTS ix_exams_course ON exams (course_code)",
+        "CREATE INDEX IF NOT EXISTS ix_exams_date ON exams (exam_date, start_time)",
+        """CREATE TABLE IF NOT EXISTS exam_centers (
+            center TEXT PRIMARY KEY,
+            capacity INTEGER NOT NULL CHECK (capacity >= 0)
+        )""",
+        # Exam cards list the student's registered courses, so they are versioned on both.
+        """INSERT OR IGNORE INTO data_versions (source, key, version, updated_at)
+            SELECT 'registrations', student, 1, datetime('now', 'localtime') FROM registrations GROUP BY student""",
+        version_trigger("tr_registrations_version_insert", "INSERT", "registrations", "registrations", "NEW.student"),
+        version_trigger("tr_registrations_version_update", "UPDATE", "registrations", "registrations", "NEW.student"),
+        version_trigger("tr_registrations_version_delete", "DELETE", "registrations", "registrations", "OLD.student"),
+    ]),
+    (13, "message read state and per-user inbox counters", [
+        "ALTER TABLE messages ADD COLUMN read_at TEXT",
+        "CREATE INDEX IF NOT EXISTS ix_messages_unread ON messages (receiver, id) WHERE read_at IS NULL",
+        *INBOX_COUNTERS,
+    ]),
+    (14, "camera capture transcoding: original size, thumbnail and pipeline status", [
+        # ``size`` stays the stored (compressed once transcoded) size.
+        "ALTER TABLE assignments ADD COLUMN original_size INTEGER",
+        "ALTER TABLE assignments ADD COLUMN thumb_sha256 TEXT",
+        "ALTER TABLE assignments ADD COLUMN media_status TEXT",
+        # Covers the pending queue and the storage savings totals without reading assignment rows.
+        "CREATE INDEX IF NOT EXISTS ix_assignments_media ON assignments (media_status, original_size, size) "
+        "WHERE media_status IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS ix_assignments_thumb ON assignments (thumb_sha256) WHERE thumb_sha256 IS NOT NULL",
+    ]),
+    (15, "re-queue hostel approvals that have no room", [
+        # The old "Approve all pending" button approved applications without
+        # a room; put them back in the queue so allocation gives them a bed.
+        "UPDATE hostel SET status='Pending' WHERE status='Approved' AND allocated_room IS NULL",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction.
+
+    ``conn`` must be in autocommit mode (isolation_level=None). Returns the
+    list of versions applied by this call.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TEXT
+    )""")
+    applied = []
+    for version, name, steps in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-checked under the write lock in case another process got here first.
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version=?", (version,)).fetchone():
+                conn.execute("ROLLBACK")
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                         (version, name, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        applied.append(version)
+    return applied
@@ -0,0 +1,198 @@
+# payments.py
+"""Asynchronous M-Pesa payment pipeline.
+
+``submit`` records a PENDING payment under an idempotency key and returns at
+once. A background PaymentProcessor sends the STK push through a pluggable
+gateway client, then polls it until the payment resolves or times out. Push
+retries and polls wait on a timer heap, so threads are only busy during
+gateway calls. After a restart, a checkout the gateway no longer knows is
+pushed again under the same idempotency key. ``handle_callback`` applies a
+gateway callback (POSTed to the API's /payments/callback, set as
+MPESA_CALLBACK_URL); whichever of callback and poll lands first wins.
+
+The gateway is the in-process SimulatedGateway unless MPESA_GATEWAY_URL
+points at a real or stub (gateway_stub.py) HTTP gateway.
+"""
+import heapq
+import json
+import os
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import db
+from gateway_stub import SimulatedGateway
+
+FINAL_STATUSES = ("SUCCESS", "FAILED", "TIMEOUT")
+POLL_INTERVAL = 1.0
+PAYMENT_TIMEOUT = 180.0
+PUSH_RETRIES = 3
+WORKERS = 8
+
+def now_str():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# ---------------------- Gateway clients ----------------------
+class HttpGateway:
+    """Client for the STK push HTTP API served by gateway_stub.py."""
+
+    def __init__(self, base_url, callback_url=None, timeout=10.0):
+        self.base_url = base_url.rstrip("/")
+        self.callback_url = callback_url
+        self.timeout = timeout
+
+    def _call(self, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def push(self, account, amount, idempotency_key, callback_url=None):
+        return self._call("/stkpush", {"account": account, "amount": amount, "idempotency_key": idempotency_key,
+                                       "callback_url": callback_url or self.callback_url})["checkout_id"]
+
+    def status(self, checkout_id):
+        return self._call(f"/status/{checkout_id}")["status"]
+
+def default_gateway():
+    url = os.environ.get("MPESA_GATEWAY_URL")
+    if url:
+        return HttpGateway(url, os.environ.get("MPESA_CALLBACK_URL"))
+    return SimulatedGateway()
+
+# ---------------------- Database ----------------------
+def record_pending(student, amount, idempotency_key=None):
+    """Insert a PENDING payment; a repeated key returns the original. Returns ``(id, status)``."""
+    key = idempotency_key or uuid.uuid4().hex
+    with db.transaction(write=True) as conn:
+        conn.execute("INSERT OR IGNORE INTO payments (student, amount, status, timestamp, idempotency_key, updated_at) "
+                     "VALUES (?, ?, 'PENDING', ?, ?, ?)", (student, amount, now_str(), key, now_str()))
+        return conn.execute("SELECT id, status FROM payments WHERE idempotency_key=?", (key,)).fetchone()
+
+def complete(payment_id, status):
+    """Move a PENDING payment to a final status. Returns False if it was already final."""
+    cur = db.execute("UPDATE payments SET status=?, updated_at=? WHERE id=? AND status='PENDING'",
+                     (status, now_str(), payment_id))
+    return cur.rowcount == 1
+
+def handle_callback(checkout_id, status):
+    """Apply a gateway callback for ``checkout_id``."""
+    if status not in FINAL_STATUSES:
+        return False
+    cur = db.execute("UPDATE payments SET status=?, updated_at=? WHERE reference=? AND status='PENDING'",
+                     (status, now_str(), checkout_id))
+    return cur.rowcount == 1
+
+def payment_status(payment_id):
+    row = db.query_one("SELECT status FROM payments WHERE id=?", (payment_id,))
+    return row[0] if row else None
+
+# ---------------------- Processor ----------------------
+class PaymentProcessor:
+    def __init__(self, gateway=None, workers=WORKERS, poll_interval=POLL_INTERVAL, timeout=PAYMENT_TIMEOUT):
+        self.gateway = gateway or default_gateway()
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="payments")
+        self._timers = []  # (due, seq, fn, args): pushes to retry and checkouts to poll
+        self._seq = 0
+        self._cv = threading.Condition()
+        self._stopped = False
+        self._scheduler = threading.Thread(target=self._run, name="payments-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def submit(self, student, amount, idempotency_key=None):
+        key = idempotency_key or uuid.uuid4().hex
+        payment_id, status = record_pending(student, amount, key)
+        if status == "PENDING":
+            self._executor.submit(self._push, payment_id, student, amount, key, 0)
+        return payment_id, status
+
+    def resume_pending(self):
+        """Re-queue PENDING payments, e.g. after a restart. Returns how many."""
+        rows = db.query("SELECT id, student, amount, idempotency_key, reference FROM payments WHERE status='PENDING'")
+        deadline = time.monotonic() + self.timeout
+        for payment_id, student, amount, key, reference in rows:
+            key = key or f"payment-{payment_id}"
+            if reference:
+                self._schedule(0, self._poll, payment_id, reference, deadline, (student, amount, key))
+            else:
+                self._executor.submit(self._push, payment_id, student, amount, key, 0)
+        return len(rows)
+
+    def _push(self, payment_id, student, amount, idempotency_key, attempt):
+        try:
+            checkout_id = self.gateway.push(student, amount, idempotency_key)
+        except Exception:
+            # The idempotency key makes a retried push safe. Back off on the
+            # timer heap rather than sleeping in a worker thread.
+            if attempt + 1 < PUSH_RETRIES:
+                self._schedule(0.5 * 2 ** attempt, self._push, payment_id, student, amount, idempotency_key,
+                               attempt + 1)
+            else:
+                complete(payment_id, "FAILED")
+            return
+        db.execute("UPDATE payments SET reference=?, updated_at=? WHERE id=?", (checkout_id, now_str(), payment_id))
+        self._schedule(self.poll_interval, self._poll, payment_id, checkout_id, time.monotonic() + self.timeout)
+
+    def _poll(self, payment_id, checkout_id, deadline, resumed=None):
+        """Check a checkout once; ``resumed`` is ``(student, amount, idempotency_key)`` after a restart."""
+        if payment_status(payment_id) != "PENDING":
+            return  # resolved by a callback
+        try:
+            status = self.gateway.status(checkout_id)
+        except Exception:
+            status = "PENDING"
+        if status == "UNKNOWN" and resumed:
+            # The gateway has no record of the checkout (e.g. it restarted too):
+            # push again under the same idempotency key instead of timing out.
+            self._push(payment_id, *resumed, 0)
+        elif status in FINAL_STATUSES:
+            complete(payment_id, status)
+        elif time.monotonic() >= deadline:
+            complete(payment_id, "TIMEOUT")
+        else:
+            self._schedule(self.poll_interval, self._poll, payment_id, checkout_id, deadline, resumed)
+
+    def _schedule(self, delay, fn, *args):
+        """Run ``fn(*args)`` on the worker pool after ``delay`` seconds."""
+        with self._cv:
+            self._seq += 1
+            heapq.heappush(self._timers, (time.monotonic() + delay, self._seq, fn, args))
+            self._cv.notify()
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._stopped and (not self._timers or self._timers[0][0] > time.monotonic()):
+                    self._cv.wait(self._timers[0][0] - time.monotonic() if self._timers else None)
+                if self._stopped:
+                    return
+                _, _, fn, args = heapq.heappop(self._timers)
+            self._executor.submit(fn, *args)
+
+    def shutdown(self):
+        with self._cv:
+            self._stopped = True
+            self._cv.notify()
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+
+_processor = None
+_processor_lock = threading.Lock()
+
+def get_processor():
+    """The process-wide processor, started (and pending payments resumed) on first use."""
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                _processor = PaymentProcessor()
+                _processor.resume_pending()
+    return _processor
+
+def submit(student, amount, idempotency_key=None):
+    return get_processor().submit(student, amount, idempotency_key)
@@ -0,0 +1,156 @@
+# reporting.py
+"""Read-only reporting snapshot for heavy admin reads.
+
+``refresh`` copies the live database into ``<name>.report.db`` next to it
+with SQLite's online backup API, in one step: the copy reads from a single
+WAL snapshot, so writers keep committing while it runs (a stepped backup
+would restart every time another connection wrote). The copy is written to a
+temporary file and renamed into place, and its mtime is set to when the copy
+started, which is what the UI shows as "data as of".
+
+Inside ``with reads():`` every read-only transaction (``db.query``,
+``db.fetch_page``, analytics, cohort documents, ...) is served from that file,
+opened ``immutable``, so long full-table reports take no locks on and cause no
+I/O against the database students are writing to. Writes in the block still
+go to the live database. A background thread refreshes the snapshot every
+REFRESH_SECONDS; any process notices a newer file by its mtime, so a
+``python -m reporting`` cron job works as well.
+
+    python -m reporting [--db myunispace.db]
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import quote
+
+import db
+import metrics
+
+ENABLED = os.environ.get("MYUNISPACE_REPORTING", "1") != "0"
+REFRESH_SECONDS = float(os.environ.get("MYUNISPACE_REPORT_REFRESH_S", "300"))
+POOL_SIZE = 4
+
+log = logging.getLogger(__name__)
+
+class SnapshotPool(db.ConnectionPool):
+    """Connections to one snapshot file, opened read-only and immutable."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        stat = os.stat(path)
+        super().__init__(path, size)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.taken_at = stat.st_mtime
+
+    def _open(self):
+        factory = db.InstrumentedConnection if metrics.ENABLED else sqlite3.Connection
+        return sqlite3.connect(f"file:{quote(os.path.abspath(self.db_file))}?immutable=1", uri=True,
+                               factory=factory, check_same_thread=False, isolation_level=None)
+
+def snapshot_path(db_file=None):
+    root, ext = os.path.splitext(db_file or db.get_pool().db_file)
+    return f"{root}.report{ext or '.db'}"
+
+def refresh(db_file=None):
+    """Replace the snapshot with a fresh copy of the live database; returns seconds taken."""
+    db_file = db_file or db.get_pool().db_file
+    path = snapshot_path(db_file)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    started = time.time()
+    source = sqlite3.connect(db_file, timeout=db.BUSY_TIMEOUT_MS / 1000)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+        # A standalone file: immutable readers must not look for a -wal file.
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+    os.utime(tmp_path, (started, started))
+    os.replace(tmp_path, path)
+    elapsed = time.time() - started
+    metrics.observe("file_io", "reporting.refresh", elapsed)
+    return elapsed
+
+_current = None
+_lock = threading.Lock()
+
+def current():
+    """Pool for the newest snapshot file, or None if there is none yet."""
+    global _current
+    path = snapshot_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if (_current is None or _current.db_file != path
+                or _current.identity != (stat.st_ino, stat.st_mtime_ns)):
+            old, _current = _current, SnapshotPool(path)
+            if old is not None:
+                old.close()
+        return _current
+
+def age(snapshot):
+    return time.time() - snapshot.taken_at
+
+def describe(snapshot):
+    """One line for the UI about where report data comes from."""
+    if snapshot is None:
+        return "Live data" if not ENABLED else "Live data (the reporting snapshot is being prepared)"
+    minutes = age(snapshot) / 60
+    return (f"Reporting snapshot, data as of {datetime.fromtimestamp(snapshot.taken_at):%Y-%m-%d %H:%M:%S} "
+            f"({minutes:.0f} min old)")
+
+@contextmanager
+def reads():
+    """Serve read-only queries in the block from the snapshot; yields it, or None when reading live data.
+
+    Until the first snapshot exists the block reads the live database and a
+    refresh is started in the background.
+    """
+    snapshot = current() if ENABLED else None
+    if ENABLED:
+        start_refresher()
+    if snapshot is None:
+        yield None
+        return
+    with db.reads_from(snapshot):
+        yield snapshot
+
+# ---------------------- Background refresh ----------------------
+_refresher = None
+
+def _refresh_loop():
+    while True:
+        snapshot = current()
+        if snapshot is None or age(snapshot) >= REFRESH_SECONDS:
+            try:
+                refresh()
+            except Exception:
+                log.exception("reporting snapshot refresh failed")
+        time.sleep(min(REFRESH_SECONDS, 60))
+
+def start_refresher():
+    """Start the background refresh thread once per process."""
+    global _refresher
+    if _refresher is None:
+        with _lock:
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, name="reporting-refresh", daemon=True)
+                _refresher.start()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m reporting", description="Refresh the reporting snapshot")
+    parser.add_argument("--db", default=db.DB_FILE)
+    args = parser.parse_args(argv)
+    db.init(args.db)
+    elapsed = refresh(args.db)
+    print(f"Wrote {snapshot_path(args.db)} in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
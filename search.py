@@ -0,0 +1,44 @@
+# search.py
+"""Ranked, prefix-matching full-text search over the FTS5 indexes.
+
+The ``<table>_fts`` indexes are created by migration 5 and kept in sync with
+their tables by triggers, so searching never scans the base table.
+"""
+import re
+
+import db
+from cache import reference
+
+# table -> (columns returned, bm25 weight per indexed column)
+SEARCHABLE = {
+    "library": ("title, author, available", (10.0, 5.0)),
+    "forum": ("user, message, timestamp", (2.0, 10.0)),
+    "jobs": ("title, company, description, contact", (10.0, 5.0, 2.0)),
+}
+
+def match_expression(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted so FTS5 operators and punctuation in user input are
+    treated as plain text.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{w}"*' for w in words)
+
+def search(table, text, limit=50):
+    """Rows of ``table`` matching ``text``, best bm25 rank first."""
+    columns, weights = SEARCHABLE[table]
+    expression = match_expression(text)
+    if not expression:
+        return []
+    fts = f"{table}_fts"
+    rank = f"bm25({fts}, {', '.join(str(w) for w in weights)})"
+    select = ", ".join(f"t.{c.strip()}" for c in columns.split(","))
+    return db.query(f"SELECT {select} FROM {fts} JOIN {table} AS t ON t.id = {fts}.rowid "
+                    f"WHERE {fts} MATCH ? ORDER BY {rank} LIMIT ?", (expression, limit))
+
+def library(text):
+    """Library search for the UI and API; a blank query lists the whole catalogue."""
+    if not (text or "").strip():
+        return reference.query("library", "SELECT title, author, available FROM library")
+    return search("library", text)
@@ -0,0 +1,146 @@
+# storage.py
+"""Content-addressed blob store for uploads.
+
+Blobs live at ``<root>/ab/cd/<sha256>``. Uploads are streamed to a temp file
+in chunks while being hashed, then renamed into place, so identical content
+is stored once however many times it is submitted.
+
+    python -m storage gc [--dry-run] [--grace SECONDS]
+"""
+import argparse
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+import db
+import metrics
+from db import UPLOAD_DIR
+
+CHUNK_SIZE = 1024 * 1024
+TMP_DIR = ".tmp"
+# Blobs younger than this are never collected: their assignments row may not
+# have been committed yet.
+GC_GRACE_SECONDS = 3600
+# Stored submission bytes allowed per student.
+QUOTA_BYTES = int(float(os.environ.get("MYUNISPACE_UPLOAD_QUOTA_MB", "200")) * 1e6)
+
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+def blob_path(digest, root=UPLOAD_DIR):
+    return os.path.join(root, digest[:2], digest[2:4], digest)
+
+def path_for(digest, filename, root=UPLOAD_DIR):
+    """Where an assignment's bytes live; rows from before the store use the flat layout."""
+    if digest:
+        return blob_path(digest, root)
+    return os.path.join(root, filename)
+
+class QuotaExceeded(Exception):
+    pass
+
+def usage(student):
+    """Bytes of stored submissions for ``student``."""
+    return db.query_one("SELECT coalesce(sum(size), 0) FROM assignments WHERE student=?", (student,))[0]
+
+def check_quota(student, incoming):
+    """Raise QuotaExceeded if ``incoming`` more bytes would take ``student`` over QUOTA_BYTES."""
+    used = usage(student)
+    if used + incoming > QUOTA_BYTES:
+        raise QuotaExceeded(f"upload quota exceeded: {used / 1e6:.1f} MB used of {QUOTA_BYTES / 1e6:.0f} MB, "
+                            f"this file is {incoming / 1e6:.1f} MB")
+
+def store(fileobj, root=UPLOAD_DIR):
+    """Stream ``fileobj`` into the store and return ``(sha256, size)``."""
+    start = time.perf_counter()
+    tmp_dir = os.path.join(root, TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        digest = sha.hexdigest()
+        target = blob_path(digest, root)
+        if os.path.exists(target):
+            # Duplicate content: keep the existing blob, refresh it against GC.
+            os.utime(target)
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    metrics.observe("file_io", "storage.store", time.perf_counter() - start, size)
+    return digest, size
+
+def iter_blobs(root=UPLOAD_DIR):
+    for shard1 in os.listdir(root):
+        dir1 = os.path.join(root, shard1)
+        if len(shard1) != 2 or not os.path.isdir(dir1):
+            continue
+        for shard2 in os.listdir(dir1):
+            dir2 = os.path.join(dir1, shard2)
+            if not os.path.isdir(dir2):
+                continue
+            for name in os.listdir(dir2):
+                if BLOB_NAME.match(name):
+                    yield name, os.path.join(dir2, name)
+
+def gc(root=UPLOAD_DIR, grace=GC_GRACE_SECONDS, dry_run=False):
+    """Delete blobs no assignments row refers to. Returns ``(count, bytes)`` removed."""
+    referenced = {r[0] for r in db.query("SELECT sha256 FROM assignments WHERE sha256 IS NOT NULL "
+                                         "UNION SELECT thumb_sha256 FROM assignments WHERE thumb_sha256 IS NOT NULL")}
+    cutoff = time.time() - grace
+    removed = freed = 0
+    for digest, path in iter_blobs(root):
+        st = os.stat(path)
+        if digest in referenced or st.st_mtime > cutoff:
+            continue
+        removed += 1
+        freed += st.st_size
+        if not dry_run:
+            os.remove(path)
+    tmp_dir = os.path.join(root, TMP_DIR)
+    if os.path.isdir(tmp_dir) and not dry_run:
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            if os.stat(path).st_mtime <= cutoff:
+                os.remove(path)
+    if not dry_run:
+        # Bottom-up, so a first-level shard is emptied before it is checked.
+        for dirpath, _, _ in os.walk(root, topdown=False):
+            if dirpath != root and len(os.path.basename(dirpath)) == 2 and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+    return removed, freed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m storage", description="Upload store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gc_parser = sub.add_parser("gc", help="remove blobs no longer referenced by any assignment")
+    gc_parser.add_argument("--dry-run", action="store_true")
+    gc_parser.add_argument("--grace", type=int, default=GC_GRACE_SECONDS,
+                           help="keep blobs modified within this many seconds")
+    gc_parser.add_argument("--db", default=db.DB_FILE)
+    gc_parser.add_argument("--root", default=UPLOAD_DIR)
+    args = parser.parse_args(argv)
+
+    db.init(args.db, args.root)
+    removed, freed = gc(args.root, args.grace, args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {removed} blob(s), {freed / 1e6:.2f} MB")
+
+if __name__ == "__main__":
+    main()
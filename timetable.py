@@ -0,0 +1,140 @@
+# timetable.py
+"""Per-student exam timetables and timetable validation.
+
+A student's timetable is the ``exams`` rows for the courses they are
+registered on. ``validate`` checks a whole timetable (or one exam day) in a
+single pass:
+
+* student clashes: each student's exams are swept in start-time order,
+  keeping the exams still running; any exam that starts before one of them
+  ends overlaps it.
+* centre over-capacity: every exam adds its registered candidates to its
+  centre when it starts and removes them when it ends; sweeping those events
+  in time order gives the running head count per centre, which is compared
+  with ``exam_centers.capacity``. Centres without a capacity are not checked.
+
+Both sweeps are linear after sorting, so the cost follows registrations plus
+exams rather than pairs of them. Times are ``HH:MM`` strings and exams do not
+run past midnight, so intervals only overlap within one exam date.
+"""
+import csv
+import io
+from collections import namedtuple
+
+import db
+
+Clash = namedtuple("Clash", "student exam_date first_course second_course overlap_start overlap_end")
+Overload = namedtuple("Overload", "center exam_date start_time candidates capacity courses")
+
+STUDENT_EXAMS = """SELECT e.course_code, e.exam_date, e.start_time, e.end_time, e.center
+    FROM registrations AS r JOIN exams AS e ON e.course_code = r.course_code
+    WHERE r.student=? ORDER BY e.exam_date, e.start_time, e.course_code"""
+
+def student_timetable(student):
+    """``(course_code, exam_date, start_time, end_time, center)`` for the student's registered courses."""
+    return db.query(STUDENT_EXAMS, (student,))
+
+def set_center_capacity(center, capacity):
+    db.execute("INSERT INTO exam_centers (center, capacity) VALUES (?, ?) "
+               "ON CONFLICT (center) DO UPDATE SET capacity = excluded.capacity", (center, int(capacity)))
+
+def centers():
+    """``(center, capacity)`` for every centre with a known capacity."""
+    return db.query("SELECT center, capacity FROM exam_centers ORDER BY center")
+
+# ---------------------- Sweeps ----------------------
+def student_clashes(rows):
+    """Clashes in ``(student, course_code, exam_date, start_time, end_time)`` rows sorted by student, date, start."""
+    clashes = []
+    running = []  # (end_time, course_code) of the current student's exams still in progress
+    current = None
+    for student, course, date, start, end in rows:
+        if (student, date) != current:
+            current = (student, date)
+            running = []
+        running = [r for r in running if r[0] > start]
+        for other_end, other in running:
+            clashes.append(Clash(student, date, other, course, start, min(other_end, end)))
+        running.append((end, course))
+    return clashes
+
+def center_overloads(exams, enrolled, capacity):
+    """Times a centre holds more candidates than its capacity.
+
+    ``exams`` are ``(course_code, exam_date, start_time, end_time, center)``,
+    ``enrolled`` maps course to candidates and ``capacity`` centre to seats.
+    Reports each rise above capacity once, with the courses sitting then.
+    """
+    events = []
+    for course, date, start, end, center in exams:
+        if center in capacity and start < end:
+            n = enrolled.get(course, 0)
+            # Ends sort before starts at the same time, so back-to-back exams never overlap.
+            events.append((center, date, start, 1, n, course))
+            events.append((center, date, end, 0, -n, course))
+    events.sort()
+    overloads = []
+    load, sitting, current = 0, {}, None
+    for center, date, time, _, delta, course in events:
+        if (center, date) != current:
+            current = (center, date)
+            load, sitting = 0, {}
+        was_over = load > capacity[center]
+        load += delta
+        if delta > 0:
+            sitting[course] = sitting.get(course, 0) + 1
+        elif sitting.get(course, 0) > 1:
+            sitting[course] -= 1
+        else:
+            sitting.pop(course, None)
+        if delta > 0 and load > capacity[center] and not was_over:
+            overloads.append(Overload(center, date, time, load, capacity[center], sorted(sitting)))
+    return overloads
+
+# ---------------------- Validation ----------------------
+def validate(exam_date=None, candidate=None):
+    """Return ``(clashes, overloads)`` for the timetable, or for one ``exam_date``.
+
+    ``candidate`` is an exam ``(course_code, exam_date, start_time, end_time,
+    center)`` that is not stored yet; it is checked together with the stored
+    exams, which is how new exams are vetted before they are posted.
+    """
+    if candidate is not None:
+        exam_date = candidate[1]
+    where, params = ("WHERE e.exam_date=?", (exam_date,)) if exam_date else ("", ())
+    exams = db.query(f"SELECT e.course_code, e.exam_date, e.start_time, e.end_time, e.center FROM exams AS e {where}",
+                     params)
+    rows = db.query("SELECT r.student, e.course_code, e.exam_date, e.start_time, e.end_time "
+                    f"FROM exams AS e JOIN registrations AS r ON r.course_code = e.course_code {where} "
+                    "ORDER BY r.student, e.exam_date, e.start_time", params)
+    if candidate is not None:
+        course, date, start, end, _ = candidate
+        exams.append(tuple(candidate))
+        rows.extend((s, course, date, start, end) for (s,) in
+                    db.query("SELECT student FROM registrations WHERE course_code=?", (course,)))
+        rows.sort(key=lambda r: (r[0], r[2], r[3]))
+    courses = {e[0] for e in exams}
+    enrolled = {c: n for c, n in db.query("SELECT course_code, count(*) FROM registrations GROUP BY course_code")
+                if c in courses}
+    return student_clashes(rows), center_overloads(exams, enrolled, dict(centers()))
+
+def check_exam(course_code, exam_date, start_time, end_time, center):
+    """Problems a new exam would cause: ``(clashes, overloads)`` that involve it."""
+    if not start_time < end_time:
+        raise ValueError("An exam must end after it starts")
+    clashes, overloads = validate(candidate=(course_code, exam_date, start_time, end_time, center))
+    clashes = [c for c in clashes if course_code in (c.first_course, c.second_course)]
+    overloads = [o for o in overloads if course_code in o.courses]
+    return clashes, overloads
+
+def report_csv(clashes, overloads):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["problem", "date", "time", "student_or_center", "courses", "detail"])
+    for c in clashes:
+        writer.writerow(["clash", c.exam_date, f"{c.overlap_start}-{c.overlap_end}", c.student,
+                         f"{c.first_course} / {c.second_course}", ""])
+    for o in overloads:
+        writer.writerow(["over capacity", o.exam_date, o.start_time, o.center, " / ".join(o.courses),
+                         f"{o.candidates} candidates for {o.capacity} seats"])
+    return out.getvalue().encode("utf-8")
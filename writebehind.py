@@ -0,0 +1,135 @@
+# writebehind.py
+"""Write-behind queue with group commit for low-criticality inserts.
+
+``submit`` puts a statement on an in-process queue and returns without
+waiting for SQLite. One writer thread drains the queue and commits up to
+MAX_BATCH statements per transaction, waiting at most MAX_DELAY seconds
+for a batch to fill, so many small writes share one commit. A full queue
+blocks producers (backpressure), and the queue is flushed at interpreter exit.
+
+Writes are only durable and visible once their batch commits, so this is
+for messages, forum posts and similar. Anything whose result the caller needs
+(payments, votes, registrations) stays on db.execute.
+
+It is off unless MYUNISPACE_WRITE_BEHIND=1: with it on, the UI reports these
+writes as done once they are queued, and a statement that later fails is only
+logged and counted in ``failures``, which the admin Caches section shows.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+import db
+import metrics
+
+ENABLED = os.environ.get("MYUNISPACE_WRITE_BEHIND", "0") == "1"
+MAX_BATCH = 500
+MAX_DELAY = 0.02
+MAX_QUEUE = 10_000
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+class WriteBehindQueue:
+    def __init__(self, max_batch=MAX_BATCH, max_delay=MAX_DELAY, max_queue=MAX_QUEUE):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self.batches = 0
+        self.statements = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params=(), timeout=None):
+        """Queue one statement; blocks while the queue is full."""
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        # The writer thread runs the statement, so remember who asked for it.
+        site = metrics.call_site() if metrics.ENABLED else None
+        self._queue.put((sql, params, site), timeout=timeout)
+
+    def flush(self):
+        """Block until everything queued so far has been committed."""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _commit(self, batch):
+        try:
+            with db.transaction(write=True) as conn:
+                for sql, params, site in batch:
+                    with metrics.attributed_to(site):
+                        conn.execute(sql, params)
+        except Exception:
+            # One bad statement must not sink the rest of the batch.
+            log.exception("write-behind batch of %d failed; retrying one by one", len(batch))
+            for sql, params, site in batch:
+                try:
+                    with metrics.attributed_to(site):
+                        db.execute(sql, params)
+                except Exception:
+                    self.failures += 1
+                    log.exception("write-behind statement dropped: %s", sql)
+        self.batches += 1
+        self.statements += len(batch)
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "batches": self.batches, "statements": self.statements,
+                "avg_batch": round(self.statements / self.batches, 1) if self.batches else 0.0,
+                "failures": self.failures}
+
+_queue = None
+_lock = threading.Lock()
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = WriteBehindQueue()
+                atexit.register(_queue.close)
+    return _queue
+
+def submit(sql, params=()):
+    """Write ``sql`` behind if enabled, otherwise synchronously."""
+    if ENABLED:
+        get_queue().submit(sql, params)
+    else:
+        db.execute(sql, params)